@@ -0,0 +1,99 @@
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from sqlalchemy import bindparam, text
+from tables import Base
+
+CONSTRAINTS = text(
+    "SELECT con.conrelid::regclass::text, con.conname, con.contype, "
+    "pg_get_constraintdef(con.oid) "
+    "FROM pg_constraint con "
+    "JOIN pg_namespace ns ON ns.oid = con.connamespace "
+    "WHERE ns.nspname = current_schema() AND con.contype IN ('f', 'c', 'u') "
+    "AND con.conrelid::regclass::text IN :tables "
+    "ORDER BY con.contype = 'f' DESC, con.conname"
+).bindparams(bindparam("tables", expanding=True))
+INDEXES = text(
+    "SELECT idx.indrelid::regclass::text, cls.relname, "
+    "pg_get_indexdef(idx.indexrelid) "
+    "FROM pg_index idx "
+    "JOIN pg_class cls ON cls.oid = idx.indexrelid "
+    "JOIN pg_namespace ns ON ns.oid = cls.relnamespace "
+    "WHERE ns.nspname = current_schema() AND NOT idx.indisprimary "
+    "AND idx.indrelid::regclass::text IN :tables "
+    "AND NOT EXISTS "
+    "(SELECT 1 FROM pg_constraint con WHERE con.conindid = idx.indexrelid)"
+).bindparams(bindparam("tables", expanding=True))
+
+
+class BulkLoad:
+    def __init__(self, engine, unlogged=True, jobs=4):
+        if engine.dialect.name != "postgresql":
+            raise ValueError("Bulk-load mode requires PostgreSQL")
+        self.engine = engine
+        self.unlogged = unlogged
+        self.jobs = jobs
+        self.tables = tuple(table.name for table in Base.metadata.sorted_tables)
+        self.constraints: list[tuple] = []
+        self.indexes: list[tuple] = []
+
+    def __enter__(self) -> "BulkLoad":
+        self.prepare()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.finish()
+
+    def prepare(self) -> None:
+        with self.engine.begin() as conn:
+            self.constraints = conn.execute(CONSTRAINTS, {"tables": self.tables}).all()
+            self.indexes = conn.execute(INDEXES, {"tables": self.tables}).all()
+            for table, name, _, _ in self.constraints:
+                conn.execute(text(f'ALTER TABLE {table} DROP CONSTRAINT "{name}"'))
+            for _, name, _ in self.indexes:
+                conn.execute(text(f'DROP INDEX "{name}"'))
+            if self.unlogged:
+                for table in self.tables:
+                    conn.execute(text(f"ALTER TABLE {table} SET UNLOGGED"))
+
+    def finish(self) -> None:
+        if self.unlogged:
+            self._parallel(
+                [[f"ALTER TABLE {table} SET LOGGED"] for table in self.tables]
+            )
+        self._parallel(
+            [[definition] for _, _, definition in self.indexes]
+            + [
+                [f'ALTER TABLE {table} ADD CONSTRAINT "{name}" {definition}']
+                for table, name, type, definition in self.constraints
+                if type == "u"
+            ]
+        )
+        validations = defaultdict(list)
+        with self.engine.begin() as conn:
+            for table, name, type, definition in self.constraints:
+                if type == "u":
+                    continue
+                conn.execute(
+                    text(
+                        f'ALTER TABLE {table} ADD CONSTRAINT "{name}" '
+                        f"{definition} NOT VALID"
+                    )
+                )
+                validations[table].append(
+                    f'ALTER TABLE {table} VALIDATE CONSTRAINT "{name}"'
+                )
+        self._parallel(list(validations.values()))
+        self.constraints = []
+        self.indexes = []
+
+    def _parallel(self, groups) -> None:
+        with ThreadPoolExecutor(self.jobs) as executor:
+            for future in [
+                executor.submit(self._execute, statements) for statements in groups
+            ]:
+                future.result()
+
+    def _execute(self, statements) -> None:
+        with self.engine.begin() as conn:
+            for statement in statements:
+                conn.execute(text(statement))
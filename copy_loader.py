@@ -0,0 +1,92 @@
+import csv
+import io
+import time
+from enum import Enum
+from sqlalchemy import inspect
+
+
+class CopyLoader:
+    def __init__(self, manager, chunk_size=10000):
+        self.manager = manager
+        self.chunk_size = chunk_size
+        self.stats: dict[str, list] = {}
+
+    def copy_many(self, model, count) -> int:
+        with self.manager.demand(count):
+            return self._copy_many(model, count)
+
+    def _copy_many(self, model, count) -> int:
+        generate = self.manager.generators[model]
+        session = self.manager.session
+        generated = 0
+        while generated < count:
+            size = min(self.chunk_size, count - generated)
+            start = time.perf_counter()
+            chunk = []
+            while len(chunk) < size and (data := generate()):
+                chunk.append(data)
+            for data in chunk:
+                self.manager.ids.assign_row(data)
+            self.copy_rows(chunk)
+            if model in self.manager.dependents:
+                self.copy_rows(
+                    [
+                        dependent
+                        for data in chunk
+                        for dependent in self.manager.dependents[model](data) or []
+                    ]
+                )
+            session.commit()
+            session.expunge_all()
+            self._record(model, len(chunk), time.perf_counter() - start)
+            generated += len(chunk)
+            if len(chunk) < size:
+                break
+        return generated
+
+    def copy_rows(self, rows) -> None:
+        if not rows:
+            return
+        model = type(rows[0])
+        columns = inspect(model).column_attrs
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, lineterminator="\n")
+        for row in rows:
+            writer.writerow(
+                [copy_value(getattr(row, column.key)) for column in columns]
+            )
+        buffer.seek(0)
+        session = self.manager.session
+        self.manager.flush()
+        cursor = session.connection().connection.cursor()
+        cursor.copy_expert(
+            f"COPY {model.__table__.name} "
+            f"({', '.join(column.columns[0].name for column in columns)}) "
+            "FROM STDIN WITH (FORMAT csv, NULL '\\N')",
+            buffer,
+        )
+        cursor.close()
+        for row in rows:
+            self.manager.key_pools.add(row)
+
+    def report(self) -> None:
+        for table, (rows, seconds) in self.stats.items():
+            print(
+                f"{table}: {rows} rows in {seconds:.2f}s "
+                f"({rows / seconds if seconds else 0:.0f} rows/s)"
+            )
+
+    def _record(self, model, rows, seconds) -> None:
+        stats = self.stats.setdefault(model.__table__.name, [0, 0.0])
+        stats[0] += rows
+        stats[1] += seconds
+
+
+def copy_value(value):
+    if value is None:
+        return "\\N"
+    if isinstance(value, Enum):
+        return value.name
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    return value
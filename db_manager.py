@@ -1,113 +1,284 @@
-from datetime import timedelta
-from typing import OrderedDict
-from sqlalchemy import MetaData, create_engine
+import numpy as np
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from itertools import groupby
+from sqlalchemy import create_engine, event, func, select
 from sqlalchemy.orm import sessionmaker
 from tables import *
 from faker import Faker
+from key_pool import KeyPools
+from copy_loader import CopyLoader
+from unique_registry import UniqueRegistry
+from role_allocator import ROLES, RoleAllocator
+from id_allocator import FreeKeyAllocator, IdAllocator, IdSpaceExhausted, SequenceIds
+from stop_index import StopIndex
+from timetable import Timetable
+from ticket_sales import PriceTable, TicketSales
+from partition import InterleavedIds, Partition, SharedTableIds, derive_seed
+from sampling import Sampler, timestamp_columns
+from vocabulary import Vocabulary
+from snapshots import Snapshots, truncate_tables
+from bulk_load import BulkLoad
+
+OFFLINE_POOLS = (
+    (AppUser.id_user,),
+    (DriversLicense.id_license,),
+    (Passenger.id_passenger,),
+    (TicketInspector.id_inspector,),
+    (Driver.id_driver,),
+    (TicketType.id_ticket_type, TicketType.price),
+    (Stop.id_stop, Stop.latitude, Stop.longitude),
+    (Path.id_path,),
+    (Path.id_path, Path.estimated_travel_time),
+    (Vehicle.id_vehicle,),
+    (Vehicle.id_vehicle, Vehicle.status),
+    (Line.id_line, Line.fk_main_path, Line.avg_frequency),
+    (Ride.id_ride, Ride.start_time),
+)
+
+
+def flush_ordered(session, rows) -> None:
+    order = {table: index for index, table in enumerate(Base.metadata.sorted_tables)}
+    for _, group in groupby(
+        sorted(rows, key=lambda row: order[row.__table__]),
+        key=lambda row: row.__table__,
+    ):
+        session.add_all(group)
+        session.flush()
 
 
 class DatabaseManager:
     def __init__(
         self,
         db_url,
+        batch_size=1000,
+        seed=None,
+        partition: Partition | None = None,
+        id_bases: dict[str, int] | None = None,
+        now: datetime | None = None,
+        vocabulary_dir=None,
+        vocabulary_seed=None,
+        shared_tables: set[str] | None = None,
+        sink=None,
+        max_vehicle_number=1000,
+        live=False,
     ):
-        self.engine = create_engine(
-            db_url,
+        self.engine = (
+            create_engine(
+                db_url,
+            )
+            if db_url
+            else None
+        )
+        self.session = (
+            sessionmaker(bind=self.engine, expire_on_commit=False)()
+            if self.engine
+            else None
         )
-        self.session = sessionmaker(bind=self.engine)()
+        self.sink = sink
         self.fake = Faker("pl_PL")
+        if seed is not None:
+            self.fake.seed_instance(seed)
+        self.now = now or datetime.now()
+        self.samples = Sampler(
+            self.fake.random.getrandbits(64), columns=timestamp_columns(self.now)
+        )
+        self.words = (
+            Vocabulary(
+                vocabulary_dir,
+                self.fake.random,
+                seed=vocabulary_seed if vocabulary_seed is not None else seed or 0,
+            )
+            if vocabulary_dir
+            else self.fake
+        )
+        self.partition = partition
+        id_bases = id_bases or {}
+        self.id_bases = id_bases
+        self.ids = (
+            SharedTableIds(
+                InterleavedIds(id_bases, partition),
+                SequenceIds(self.session, batch_size),
+                shared_tables,
+            )
+            if partition and shared_tables is not None and not sink
+            else (
+                InterleavedIds(id_bases, partition or Partition(0, 1))
+                if partition or sink
+                else SequenceIds(self.session, batch_size)
+            )
+        )
+        key_filters = lambda key: (
+            partition.key_filters(key, id_bases)
+            if partition and (shared_tables is None or key.table.name in shared_tables)
+            else ()
+        )
+        self.pending = []
+        if self.session:
+            event.listen(self.session, "before_flush", self.ids.assign)
+        self.key_pools = KeyPools(self.session)
+        if sink:
+            for columns in OFFLINE_POOLS:
+                self.key_pools.track(*columns)
+        self.unique = UniqueRegistry(self.session, partition=partition)
+        self.batch_size = batch_size
+        self.max_vehicle_number = max_vehicle_number
+        self.live = live
+        self.roles = RoleAllocator(
+            self.session,
+            self.generate_user,
+            self.stage_data,
+            self.fake.random,
+            batch_size,
+            key_filters(AppUser.id_user),
+            lambda: self.key_pools.get(AppUser.id_user).values[0],
+        )
+        self.licenses = FreeKeyAllocator(
+            self.session,
+            DriversLicense.id_license,
+            select(Driver.fk_license),
+            self.generate_drivers_license,
+            self.stage_data,
+            self.fake.random,
+            batch_size,
+            key_filters(DriversLicense.id_license),
+            lambda: self.key_pools.get(DriversLicense.id_license).values[0],
+        )
+        self.vehicle_numbers: IdAllocator | None = None
+        self.vehicle_numbers_bound = None
+        self.stop_index: StopIndex | None = None
+        self.timetable: Timetable | None = None
+        self.rides: list[tuple] = []
+        self.ride_day: np.datetime64 | None = None
+        self.ride_start: np.datetime64 | None = None
+        self.ride_end: np.datetime64 | None = None
+        self.ride_budget: int | None = None
+        self.requested: int | None = None
+        self.generators = {
+            AppUser: self.generate_user,
+            Passenger: self.generate_passenger,
+            TicketInspector: self.generate_ticket_inspector,
+            Driver: self.generate_driver,
+            DriversLicense: self.generate_drivers_license,
+            Editor: self.generate_editor,
+            Stop: self.generate_stop,
+            Path: self.generate_path,
+            Fine: self.generate_fine,
+            Ticket: self.generate_ticket,
+            Vehicle: self.generate_vehicle,
+            Line: self.generate_line,
+            Ride: self.generate_ride,
+            Inspection: self.generate_inspection,
+            TechnicalIssue: self.generate_technical_issue,
+        }
+        self.dependents = {
+            Path: self.generate_pathstops,
+        }
+        self.price_table: PriceTable | None = None
+        self.ticket_sales = TicketSales(self)
+        self.bulk_generators = {
+            Ticket: self.ticket_sales.generate,
+        }
+        self.copy_loader = CopyLoader(self)
 
     def create_tables(self) -> None:
         Base.metadata.create_all(self.engine)
 
     def clear_database(self) -> None:
-        meta = MetaData()
-        meta.reflect(bind=self.engine)
-        with self.engine.begin() as conn:
-            for table in reversed(meta.sorted_tables):
-                conn.execute(table.delete())
-        meta.drop_all(bind=self.engine)
+        self.session.rollback()
         self.create_tables()
+        truncate_tables(self.engine)
+        self.reset_caches()
+
+    def save_snapshot(self, name, method="template") -> None:
+        self.commit()
+        self.session.close()
+        self.engine.dispose()
+        snapshots = Snapshots(self.engine.url)
+        try:
+            snapshots.save(name, method)
+        finally:
+            snapshots.close()
+
+    def restore_snapshot(self, name, method="template") -> None:
+        self.session.close()
+        self.engine.dispose()
+        snapshots = Snapshots(self.engine.url)
+        try:
+            snapshots.restore(name, method)
+        finally:
+            snapshots.close()
+        self.reset_caches()
+
+    def reset_caches(self) -> None:
+        self.pending = []
+        self.ids.reset()
+        self.key_pools.invalidate()
+        self.unique.invalidate()
+        self.roles.invalidate()
+        self.licenses.invalidate()
+        self.vehicle_numbers = None
+        self.price_table = None
+        self.timetable = None
+        self.rides = []
+        self.ride_day = None
 
     def generate_user(self) -> AppUser:
-        used_logins = [login for (login,) in self.session.query(AppUser.login).all()]
-        used_emails = [email for (email,) in self.session.query(AppUser.email).all()]
-        while (login := self.fake.user_name()) in used_logins:
-            pass
-        while (email := self.fake.email()) in used_emails:
-            pass
+        login = self.unique.claim(AppUser.login, self.words.user_name)
+        email = self.unique.claim(
+            AppUser.email,
+            self.words.email,
+            lambda email, n: email.replace("@", f"{n}@", 1),
+        )
         return AppUser(
             login=login,
-            password=self.fake.password(),
+            password=self.words.password(),
             email=email,
-            phone_number=self.fake.phone_number(),
-            name=self.fake.first_name(),
-            surname=self.fake.last_name(),
+            phone_number=self.words.phone_number(),
+            name=self.words.first_name(),
+            surname=self.words.last_name(),
         )
 
-    def generate_vehicle(self, max_number=1000) -> Vehicle:
-
-        production_date = self.fake.date_time_this_decade()
-        last_technical_inspection = self.fake.date_time_between(
-            start_date=production_date, end_date="now"
-        )
-        existing_numbers = [
-            vn[0] for vn in self.session.query(Vehicle.vehicle_number).all()
-        ]
-        vehicle_number = self.fake.random_element(
-            [i for i in range(1, max_number) if i not in existing_numbers]
-        )
+    def generate_vehicle(self, max_number=None) -> Vehicle:
+        max_number = max_number or self.max_vehicle_number
+        production_date, last_technical_inspection = self.samples.draw("vehicles.dates")
+        if self.vehicle_numbers is None or self.vehicle_numbers_bound != max_number:
+            self.vehicle_numbers = IdAllocator.bounded(
+                (
+                    self.partition.slots(1, max_number)
+                    if self.partition
+                    else range(1, max_number)
+                ),
+                self.unique.used(Vehicle.vehicle_number),
+                self.fake.random,
+            )
+            self.vehicle_numbers_bound = max_number
+        try:
+            vehicle_number = self.vehicle_numbers.reserve()
+        except IdSpaceExhausted:
+            raise IdSpaceExhausted(f"No free vehicle numbers below {max_number}")
+        self.unique.used(Vehicle.vehicle_number).add(vehicle_number)
         return Vehicle(
             vehicle_number=vehicle_number,
             production_date=production_date,
             last_technical_inspection=last_technical_inspection,
-            type=self.fake.random_elements(
-                elements=OrderedDict(
-                    [(VehicleTypeEnum.Bus, 0.8), (VehicleTypeEnum.Tram, 0.2)]
-                ),
-                length=1,
-                unique=True,
-            )[0],
-            status=self.fake.random_elements(
-                elements=OrderedDict(
-                    [(VehicleStatusEnum.Inactive, 0.1), (VehicleStatusEnum.Active, 0.9)]
-                ),
-                length=1,
-                unique=True,
-            )[0],
-            air_conditioning=self.fake.boolean(chance_of_getting_true=75),
-            capacity=self.fake.random_element([30, 50, 70, 80, 90, 100]),
+            type=self.samples.draw("vehicles.type"),
+            status=self.samples.draw("vehicles.status"),
+            air_conditioning=self.samples.draw("vehicles.air_conditioning"),
+            capacity=self.samples.draw("vehicles.capacity"),
         )
 
     def generate_drivers_license(self) -> DriversLicense:
-        issued_on = self.fake.date_time_this_decade()
-        expires_on = issued_on + timedelta(
-            days=self.fake.random_int(min=6 * 365, max=180 * 365, step=30)
-        )
+        issued_on, expires_on = self.samples.draw("drivers_licenses.dates")
         return DriversLicense(
             issued_on=issued_on,
             expires_on=expires_on,
         )
 
     def generate_driver(self) -> Driver:
-        used_license_ids = [
-            license_id for (license_id,) in self.session.query(Driver.fk_license).all()
-        ]
-
-        avalible_licenses = (
-            self.session.query(DriversLicense.id_license).filter(
-                DriversLicense.id_license.notin_(used_license_ids)
-            )
-        ).all()
-        fk_user_id = self.get_unused_user_id()
-
-        if not avalible_licenses:
-            license = self.generate_drivers_license()
-            self.insert_data(license)
-            return Driver(fk_user=fk_user_id, fk_license=license.id_license)
         return Driver(
-            fk_user=fk_user_id,
-            fk_license=self.fake.random_element(avalible_licenses).id_license,
+            fk_user=self.get_unused_user_id(),
+            fk_license=self.licenses.allocate(),
         )
 
     def generate_passenger(self) -> Passenger:
@@ -171,88 +342,75 @@ class DatabaseManager:
                     is_discounted=discount == TicketDiscountTypeEnum.Discounted,
                 )
             )
-        for ticket in tickets:
-            self.insert_data(ticket)
+        self.add_all_data(tickets)
+        self.commit()
+        self.price_table = PriceTable(
+            [ticket.id_ticket_type for ticket in tickets],
+            [ticket.price for ticket in tickets],
+        )
         return None
 
     def generate_fine(self, baseFinePrice=250) -> Fine:
-        passangers = [id for (id,) in self.session.query(Passenger.id_passenger).all()]
-        ticket_inspectors = [
-            id for (id,) in self.session.query(TicketInspector.id_inspector).all()
-        ]
+        passangers = self.key_pools.get(Passenger.id_passenger)
+        ticket_inspectors = self.key_pools.get(TicketInspector.id_inspector)
         if not passangers or not ticket_inspectors:
             return None
-        issue_date = self.fake.date_time_this_decade()
-        deadline = issue_date + timedelta(90)
+        issue_date, deadline = self.samples.draw("fines.dates")
 
         return Fine(
-            fk_passenger=self.fake.random_element(passangers),
-            fk_inspector=self.fake.random_element(ticket_inspectors),
+            fk_passenger=passangers.pick(self.fake.random),
+            fk_inspector=ticket_inspectors.pick(self.fake.random),
             amount=baseFinePrice,
             issue_date=issue_date,
             deadline=deadline,
-            status=self.fake.random_elements(
-                elements=OrderedDict(
-                    [(FineStatusEnum.Paid, 0.95), (FineStatusEnum.Unpaid, 0.05)]
-                ),
-                length=1,
-            )[0],
+            status=self.samples.draw("fines.status"),
         )
 
     def generate_ticket(self) -> Ticket:
-        passengers = [id for (id,) in self.session.query(Passenger.id_passenger).all()]
-        ticket_types = [ticket for ticket in self.session.query(TicketType).all()]
+        passengers = self.key_pools.get(Passenger.id_passenger)
+        ticket_types = self.key_pools.get(TicketType.id_ticket_type, TicketType.price)
         if not passengers or not ticket_types:
             return
-        ticket_type = self.fake.random_element(ticket_types)
-        purchase = self.generate_purchase(ticket_type.price)
-        self.insert_data(purchase)
+        ticket_type, price = ticket_types.pick(self.fake.random)
+        purchase = self.generate_purchase(price)
+        self.stage_data([purchase])
         return Ticket(
-            fk_passenger=self.fake.random_element(passengers),
+            fk_passenger=passengers.pick(self.fake.random),
             fk_purchase=purchase.id_purchase,
-            fk_ticket_type=ticket_type.id_ticket_type,
+            fk_ticket_type=ticket_type,
         )
 
     def generate_purchase(self, amount) -> Purchase:
-        date = self.fake.date_time_this_decade()
+        date = self.samples.draw("purchases.date")
         return Purchase(amount=amount, date=date)
 
     def generate_inspection(self) -> Inspection:
-        date = self.fake.date_time_this_decade()
-        inspectors = [
-            id for (id,) in self.session.query(TicketInspector.id_inspector).all()
-        ]
-        rides = [id for (id,) in self.session.query(Ride.id_ride).all()]
+        inspectors = self.key_pools.get(TicketInspector.id_inspector)
+        rides = self.key_pools.get(Ride.id_ride, Ride.start_time)
         if not inspectors or not rides:
             return None
+        for _ in range(8):
+            ride, start_time = rides.pick(self.fake.random)
+            if start_time <= self.now:
+                break
+        else:
+            return None
+        minutes = int(self.samples.draw("inspections.minutes_into_ride"))
         return Inspection(
-            fk_inspector=self.fake.random_element(inspectors),
-            fk_ride=self.fake.random_element(rides),
-            date=date,
+            fk_inspector=inspectors.pick(self.fake.random),
+            fk_ride=ride,
+            date=min(start_time + timedelta(minutes=minutes), self.now),
         )
 
     def generate_stop(self, longitude=17.038538, latitude=51.107883, type=None) -> Stop:
-        used_names = [name for (name,) in self.session.query(Stop.name).all()]
-        while (name := self.fake.street_address()) in used_names:
-            pass
-        type = (
-            type
-            if type
-            else self.fake.random_elements(
-                elements=OrderedDict(
-                    [
-                        (StopTypesEnum.Bus, 0.6),
-                        (StopTypesEnum.Tram, 0.2),
-                        (StopTypesEnum.BusTram, 0.2),
-                    ]
-                ),
-                length=1,
-            )[0]
+        name = self.unique.claim(
+            Stop.name, self.words.street_address, lambda name, n: f"{name} {n}"
         )
-        seating_available = self.fake.boolean(chance_of_getting_true=80)
-        shelter = self.fake.boolean(chance_of_getting_true=75)
+        type = type if type else self.samples.draw("stops.type")
+        seating_available = self.samples.draw("stops.seating_available")
+        shelter = self.samples.draw("stops.shelter")
         getNextCoords = (
-            lambda x: x + self.fake.random_int(min=-250000, max=250000) / 1000000
+            lambda x: x + self.samples.draw("stops.coordinate_offset") / 1000000
         )
         while (latitude := getNextCoords(latitude)) < 50.05 or latitude > 52.15:
             pass
@@ -268,8 +426,8 @@ class DatabaseManager:
         )
 
     def generate_path(self) -> Path:
-        distance = self.fake.random_int(min=5, max=50)
-        number_of_stops = self.fake.random_int(min=15, max=30)
+        distance = self.samples.draw("paths.distance")
+        number_of_stops = self.samples.draw("paths.number_of_stops")
         estimated_travel_time = int(distance / 35 * 60 + number_of_stops)
         return Path(
             distance=distance,
@@ -278,25 +436,16 @@ class DatabaseManager:
         )
 
     def generate_line(self) -> Line:
-        paths = [id for (id,) in self.session.query(Path.id_path).all()]
+        paths = self.key_pools.get(Path.id_path)
         if not paths:
             return None
-        used_lines_numbers = [
-            number for (number,) in self.session.query(Line.number).all()
-        ]
         numberGen = lambda: (
-            str(self.fake.random_int(min=0, max=999))
-            + self.fake.random_elements(
-                elements=OrderedDict(
-                    [("A", 0.2), ("B", 0.02), ("C", 0.02), ("D", 0.02), ("", 0.92)],
-                ),
-                length=1,
-            )[0]
+            str(self.samples.draw("lines.number"))
+            + self.samples.draw("lines.number_suffix")
         )
-        while (number := numberGen()) in used_lines_numbers:
-            pass
-        main_path = self.fake.random_element(paths)
-        avg_frequency = self.fake.random_int(min=5, max=90)
+        number = self.unique.claim(Line.number, numberGen)
+        main_path = paths.pick(self.fake.random)
+        avg_frequency = self.samples.draw("lines.avg_frequency")
         return Line(
             number=number,
             fk_main_path=main_path,
@@ -304,21 +453,17 @@ class DatabaseManager:
         )
 
     def generate_pathstops(self, path: Path) -> list[PathStop]:
-        stops = self.session.query(Stop).all()
+        stops = self.key_pools.get(Stop.id_stop, Stop.latitude, Stop.longitude)
         if len(stops) < path.number_of_stops:
             print("Not enough stops to generate pathstops")
             return None
-        stops = self.fake.random_elements(
-            elements=stops, length=path.number_of_stops, unique=True
-        )
-        initial_stop = stops[0]
-        stops = [initial_stop] + sorted(
-            stops[1:], key=lambda stop: self.calculate_distance(initial_stop, stop)
-        )
+        if self.stop_index is None or not self.stop_index.is_current(stops):
+            self.stop_index = StopIndex(stops)
+        stops = self.stop_index.walk(path.number_of_stops, self.fake.random)
         return [
             PathStop(
                 id_path=path.id_path,
-                id_stop=stop.id_stop,
+                id_stop=stop,
                 path_minute=int(
                     path.estimated_travel_time / path.number_of_stops * (i + 1)
                 ),
@@ -327,31 +472,19 @@ class DatabaseManager:
         ]
 
     def generate_technical_issue(self) -> TechnicalIssue:
-        vehicles = [id for (id,) in self.session.query(Vehicle.id_vehicle).all()]
-        drivers = [id for (id,) in self.session.query(Driver.id_driver).all()]
+        vehicles = self.key_pools.get(Vehicle.id_vehicle)
+        drivers = self.key_pools.get(Driver.id_driver)
         if not vehicles or not drivers:
             return None
-        description = self.fake.text()[0:254]
-        report_date = self.fake.date_time_this_decade()
-        status = self.fake.random_elements(
-            elements=OrderedDict(
-                [
-                    (TechnicalIssueStatusEnum.Reported, 0.1),
-                    (TechnicalIssueStatusEnum.InProgress, 0.1),
-                    (TechnicalIssueStatusEnum.Resolved, 0.8),
-                ]
-            ),
-            length=1,
-        )[0]
-        resolve_date = (
-            None
-            if status != TechnicalIssueStatusEnum.Resolved
-            else self.fake.date_time_between(start_date=report_date, end_date="now")
-        )
+        description = self.words.text()[0:254]
+        report_date, resolve_date = self.samples.draw("technical_issues.dates")
+        status = self.samples.draw("technical_issues.status")
+        if status != TechnicalIssueStatusEnum.Resolved:
+            resolve_date = None
         repair_cost = (
             0
             if status != TechnicalIssueStatusEnum.Resolved
-            else self.fake.random_int(min=50, max=5000)
+            else self.samples.draw("technical_issues.repair_cost")
         )
         return TechnicalIssue(
             description=description,
@@ -359,70 +492,223 @@ class DatabaseManager:
             status=status,
             resolve_date=resolve_date,
             repair_cost=repair_cost,
-            fk_vehicle=self.fake.random_element(vehicles),
-            fk_driver=self.fake.random_element(drivers),
+            fk_vehicle=vehicles.pick(self.fake.random),
+            fk_driver=drivers.pick(self.fake.random),
         )
 
     def generate_ride(self) -> Ride:
-        lines = [line for line in self.session.query(Line).all()]
-        vehicles = [id for (id,) in self.session.query(Vehicle.id_vehicle).all()]
-        drivers = [id for (id,) in self.session.query(Driver.id_driver).all()]
-        if not lines or not vehicles or not drivers:
+        if not self.rides:
+            self.schedule_rides()
+        if not self.rides:
             return None
-        line = self.fake.random_element(lines)
-        vehicle = self.fake.random_element(vehicles)
-        driver = self.fake.random_element(drivers)
-        start_time = self.fake.date_time_this_decade()
-        weekday = WeekdayEnum.from_int(start_time.weekday() + 1)
+        line, main_path, vehicle, driver, start_time, weekday = self.rides.pop()
         return Ride(
-            fk_line=line.id_line,
+            fk_line=line,
             fk_vehicle=vehicle,
             fk_driver=driver,
-            fk_path=line.fk_main_path,
+            fk_path=main_path,
             start_time=start_time,
-            weekday=weekday,
+            weekday=WeekdayEnum.from_int(weekday),
         )
 
-    def calculate_distance(self, stop1: Stop, stop2: Stop) -> float:
-        return (
-            (stop1.latitude - stop2.latitude) ** 2
-            + (stop1.longitude - stop2.longitude) ** 2
-        ) ** 0.5
-
-    def get_unused_user_id(self) -> int:
-        used_ids = [
-            user_id
-            for (user_id,) in (
-                self.session.query(Driver.fk_user)
-                .union(
-                    self.session.query(Passenger.fk_user).union(
-                        self.session.query(TicketInspector.fk_user).union(
-                            self.session.query(Editor.fk_user)
-                        )
+    def schedule_rides(self) -> None:
+        lines = self.key_pools.get(Line.id_line, Line.fk_main_path, Line.avg_frequency)
+        paths = self.key_pools.get(Path.id_path, Path.estimated_travel_time)
+        vehicles = self.key_pools.get(Vehicle.id_vehicle, Vehicle.status)
+        drivers = self.key_pools.get(Driver.id_driver)
+        if not lines or not vehicles or not drivers:
+            return
+        if self.timetable is None or not self.timetable.is_current(
+            lines, paths, vehicles, drivers
+        ):
+            self.timetable = Timetable(
+                lines,
+                paths,
+                vehicles,
+                drivers,
+                (
+                    derive_seed("live", self.now.date())
+                    if self.live
+                    else self.fake.random.getrandbits(64)
+                ),
+            )
+        if self.ride_day is None:
+            self.plan_rides()
+        if self.ride_end is not None and self.ride_day > self.ride_end:
+            self.extend_ride_window()
+        self.rides = self.timetable.day(self.ride_day)
+        if self.live:
+            self.rides = [ride for ride in self.rides if ride[4] >= self.now]
+            if self.partition:
+                self.rides = self.rides[self.partition.index :: self.partition.count]
+        if self.ride_budget is not None:
+            self.ride_budget -= len(self.rides)
+        self.rides.reverse()
+        self.ride_day += self.partition.count if self.partition and not self.live else 1
+
+    def last_ride_day(self) -> np.datetime64:
+        return np.datetime64(self.now.date(), "D") - 1
+
+    def ride_window_days(self) -> int:
+        per_day = max(self.timetable.rides_per_day(self.last_ride_day()), 1)
+        return -(-max(self.ride_budget, 1) // per_day) + 1
+
+    def plan_rides(self) -> None:
+        index = self.partition.index if self.partition else 0
+        step = self.partition.count if self.partition else 1
+        self.ride_end = self.ride_budget = None
+        if self.live:
+            self.ride_start = self.ride_day = np.datetime64(self.now.date(), "D")
+            return
+        earliest, latest = (
+            self.session.execute(
+                select(func.min(Ride.start_time), func.max(Ride.start_time)).where(
+                    *(
+                        [Ride.id_ride <= self.id_bases.get(Ride.__tablename__, 0)]
+                        if self.partition
+                        else []
                     )
                 )
-                .all()
-            )
-        ]
-
-        avaliable_ids = (
-            self.session.query(AppUser.id_user).filter(AppUser.id_user.notin_(used_ids))
-        ).all()
+            ).one()
+            if self.session
+            else (None, None)
+        )
+        if self.requested is None:
+            start = np.datetime64((self.now - timedelta(days=365)).date(), "D")
+            if latest:
+                start = max(start, np.datetime64(latest.date(), "D") + 1)
+        else:
+            self.ride_budget = self.requested
+            self.ride_end = self.last_ride_day()
+            days = self.ride_window_days() * step
+            start = self.ride_end - days + 1
+            if latest and np.datetime64(latest.date(), "D") >= start:
+                if np.datetime64(latest.date(), "D") + days <= self.ride_end:
+                    start = np.datetime64(latest.date(), "D") + 1
+                else:
+                    self.ride_end = np.datetime64(earliest.date(), "D") - 1
+                    start = self.ride_end - days + 1
+        self.ride_start = start
+        self.ride_day = start + index
+        self.timetable.rewind()
+
+    def extend_ride_window(self) -> None:
+        index = self.partition.index if self.partition else 0
+        step = self.partition.count if self.partition else 1
+        self.ride_end = self.ride_start - 1
+        self.ride_start = self.ride_end - self.ride_window_days() * step + 1
+        self.ride_day = self.ride_start + index
+        self.timetable.rewind()
 
-        if not avaliable_ids:
-            user = self.generate_user()
-            self.insert_data(user)
-            return user.id_user
-        return self.fake.random_element(avaliable_ids)[0]
+    def get_unused_user_id(self) -> int:
+        return self.roles.allocate()
 
     def remove_table_content(self, table):
         self.session.query(table).delete()
         self.session.commit()
+        self.key_pools.invalidate(table)
+        self.unique.invalidate(table)
+        if table is AppUser or table in ROLES:
+            self.roles.invalidate()
+        if table in (DriversLicense, Driver):
+            self.licenses.invalidate()
+        if table is Vehicle:
+            self.vehicle_numbers = None
+        if table is TicketType:
+            self.price_table = None
+        if table in (Ride, Line, Vehicle, Driver):
+            self.rides = []
+            self.ride_day = None
 
     def insert_data(self, data):
         if data:
-            self.session.add(data)
-            self.session.commit()
+            self.add_data(data)
+            self.commit()
+
+    def add_data(self, data):
+        self.add_all_data([data])
+
+    def add_all_data(self, rows):
+        self.stage_data(rows)
+        self.flush()
+
+    def stage_data(self, rows):
+        for row in rows:
+            self.ids.assign_row(row)
+        if not self.sink:
+            self.pending.extend(rows)
+            return
+        for row in rows:
+            self.sink.write(row)
+            self.key_pools.add(row)
+            self.unique.add(row)
+
+    def flush(self):
+        pending, self.pending = self.pending, []
+        flush_ordered(self.session, pending)
+
+    def commit(self):
+        if self.sink:
+            return
+        self.flush()
+        self.session.commit()
+        self.session.expunge_all()
+
+    def generate_many(self, model, count, batch_size=None) -> int:
+        if model in self.bulk_generators:
+            return self.bulk_generators[model](count, batch_size)
+        generated = 0
+        for batch, rows in self.generate_batches(model, count, batch_size):
+            self.pending = rows
+            self.commit()
+            generated += len(batch)
+        return generated
+
+    def generate_batches(self, model, count, batch_size=None):
+        generate = self.generators[model]
+        batch_size = batch_size or self.batch_size
+        generated = 0
+        with self.demand(count):
+            while generated < count:
+                size = min(batch_size, count - generated)
+                batch = []
+                while len(batch) < size and (data := generate()):
+                    self.stage_data([data])
+                    batch.append(data)
+                if model in self.dependents:
+                    for data in batch:
+                        self.stage_data(self.dependents[model](data) or [])
+                rows, self.pending = self.pending, []
+                yield batch, rows
+                generated += len(batch)
+                if len(batch) < size:
+                    break
+
+    @contextmanager
+    def demand(self, count):
+        self.roles.demand = self.licenses.demand = self.requested = count
+        self.ride_day = None
+        try:
+            yield
+        finally:
+            self.roles.demand = self.licenses.demand = self.requested = None
+
+    def bulk_load(self, plan: dict, unlogged=True, jobs=4, use_copy=True) -> dict:
+        from scheduler import dependency_order
+
+        self.commit()
+        self.session.close()
+        load = self.copy_many if use_copy else self.generate_many
+        with BulkLoad(self.engine, unlogged, jobs):
+            return {
+                model: load(model, plan[model])
+                for model in dependency_order(model for model in plan if plan[model])
+            }
+
+    def copy_many(self, model, count, chunk_size=None) -> int:
+        if chunk_size:
+            self.copy_loader.chunk_size = chunk_size
+        return self.copy_loader.copy_many(model, count)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,24 @@
+from datetime import date, datetime, time
+from db_manager import DatabaseManager
+from scheduler import dependency_order
+from sinks import FileSink
+
+
+def export(directory, plan: dict, format="csv", seed=0, now=None, **options) -> dict:
+    sink = FileSink(directory, format)
+    manager = DatabaseManager(
+        None,
+        seed=seed,
+        now=now or datetime.combine(date.today(), time()),
+        sink=sink,
+        **options,
+    )
+    manager.generate_ticket_types()
+    try:
+        for model in dependency_order(model for model in plan if plan[model]):
+            manager.generate_many(model, plan[model])
+    finally:
+        sink.close()
+    sink.report()
+    manager.unique.report()
+    return dict(sink.rows)
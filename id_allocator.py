@@ -0,0 +1,166 @@
+from array import array
+from collections import deque
+from itertools import compress
+from operator import not_
+from sqlalchemy import event, func, inspect, select, text
+from sqlalchemy.orm import Session
+
+
+class IdSpaceExhausted(Exception):
+    pass
+
+
+class IdAllocator:
+    def __init__(self, free, random):
+        self.free = array("q", free)
+        self.random = random
+
+    @classmethod
+    def bounded(cls, slots: range, taken, random) -> "IdAllocator":
+        bitmap = bytearray(len(slots))
+        for id in taken:
+            if id in slots:
+                bitmap[(id - slots.start) // slots.step] = 1
+        return cls(compress(slots, map(not_, bitmap)), random)
+
+    def reserve(self) -> int:
+        if not self.free:
+            raise IdSpaceExhausted("No free ids left")
+        index = self.random.randrange(len(self.free))
+        id = self.free[index]
+        self.free[index] = self.free[-1]
+        self.free.pop()
+        return id
+
+    def reserve_many(self, count) -> list[int]:
+        if count > len(self.free):
+            raise IdSpaceExhausted(f"Requested {count} ids, only {len(self.free)} left")
+        return [self.reserve() for _ in range(count)]
+
+    def release(self, ids) -> None:
+        self.free.extend(ids)
+
+    def __len__(self) -> int:
+        return len(self.free)
+
+
+class FreeKeyAllocator:
+    def __init__(
+        self,
+        session: Session | None,
+        key,
+        used,
+        create,
+        store,
+        random,
+        top_up_size=1000,
+        filters=(),
+        keys=None,
+    ):
+        self.session = session
+        self.key = key
+        self.used = used
+        self.filters = filters
+        self.keys = keys
+        self.create = create
+        self.store = store
+        self.random = random
+        self.top_up_size = top_up_size
+        self.allocated = 0
+        self.demand: int | None = None
+        self.allocator: IdAllocator | None = None
+        if session is not None:
+            event.listen(session, "after_rollback", lambda session: self.invalidate())
+
+    def load(self) -> None:
+        self.allocator = IdAllocator(
+            (
+                self.session.scalars(
+                    select(self.key)
+                    .where(self.key.notin_(self.used), *self.filters)
+                    .order_by(self.key)
+                )
+                if self.session
+                else self.keys() if self.keys else ()
+            ),
+            self.random,
+        )
+
+    def allocate(self) -> int:
+        if self.allocator is None:
+            self.load()
+        if not self.allocator:
+            self.top_up()
+        self.allocated += 1
+        if self.demand is not None:
+            self.demand -= 1
+        return self.allocator.reserve()
+
+    def top_up(self) -> None:
+        size = min(self.top_up_size, max(self.allocated, 1))
+        if self.demand is not None:
+            size = min(size, max(self.demand, 1))
+        rows = [self.create() for _ in range(size)]
+        self.store(rows)
+        self.allocator.release(getattr(row, self.key.key) for row in rows)
+
+    def invalidate(self) -> None:
+        self.allocator = None
+
+
+class SequenceIds:
+    def __init__(self, session: Session, block_size=1000):
+        self.session = session
+        self.block_size = block_size
+        self.blocks: dict[str, deque] = {}
+        self.issued: dict[str, int] = {}
+
+    def reserve(self, key, count) -> list[int]:
+        connection = self.session.connection()
+        table = key.table.name
+        if connection.dialect.name == "postgresql":
+            return (
+                connection.execute(
+                    text(
+                        "SELECT nextval(pg_get_serial_sequence(:table, :column)) "
+                        "FROM generate_series(1, :count)"
+                    ),
+                    {"table": table, "column": key.name, "count": count},
+                )
+                .scalars()
+                .all()
+            )
+        if table not in self.issued:
+            self.issued[table] = connection.scalar(
+                select(func.coalesce(func.max(key), 0))
+            )
+        start = self.issued[table]
+        self.issued[table] += count
+        return list(range(start + 1, start + count + 1))
+
+    def take(self, key, count) -> list[int]:
+        return self.reserve(key, count)
+
+    def next(self, key) -> int:
+        block = self.blocks.get(key.table.name)
+        if not block:
+            block = self.blocks[key.table.name] = deque(
+                self.reserve(key, self.block_size)
+            )
+        return block.popleft()
+
+    def assign(self, session, flush_context, instances) -> None:
+        for obj in session.new:
+            self.assign_row(obj)
+
+    def assign_row(self, obj) -> None:
+        mapper = inspect(obj).mapper
+        if len(mapper.primary_key) != 1:
+            return
+        key = mapper.get_property_by_column(mapper.primary_key[0]).key
+        if getattr(obj, key) is None:
+            setattr(obj, key, self.next(mapper.primary_key[0]))
+
+    def reset(self) -> None:
+        self.blocks = {}
+        self.issued = {}
@@ -0,0 +1,196 @@
+import json
+import sys
+import threading
+import time
+from collections import defaultdict
+from functools import wraps
+from sqlalchemy import event
+
+UNTIMED = ("generate_many", "generate_batches")
+
+
+def generator_stats() -> dict:
+    return {
+        "calls": 0,
+        "produced": 0,
+        "wall": 0.0,
+        "cpu": 0.0,
+        "statements": 0,
+        "rows_fetched": 0,
+    }
+
+
+def table_stats() -> dict:
+    return {
+        "rows": 0,
+        "commits": 0,
+        "statements": 0,
+        "rows_fetched": 0,
+        "wall": 0.0,
+        "cpu": 0.0,
+    }
+
+
+class Instrumentation:
+    def __init__(self, manager, live=True, interval=2.0):
+        self.manager = manager
+        self.live = live
+        self.interval = interval
+        self.generators = defaultdict(generator_stats)
+        self.tables = defaultdict(table_stats)
+        self.stack: list[str] = []
+        self.table = None
+        self.generator = None
+        self.counted: set[str] = set()
+        self.bulk_names = {}
+        self.thread = threading.get_ident()
+        self.printed = time.perf_counter()
+        event.listen(manager.engine, "after_cursor_execute", self._after_execute)
+        event.listen(manager.engine, "commit", self._commit)
+        self._wrap()
+
+    def _wrap(self) -> None:
+        manager = self.manager
+        timed = {}
+        for name in dir(type(manager)):
+            if name.startswith("generate_") and name not in UNTIMED:
+                timed[name] = self._timed(name, getattr(manager, name))
+                setattr(manager, name, timed[name])
+        manager.generators = {
+            model: timed[generate.__name__]
+            for model, generate in manager.generators.items()
+        }
+        manager.dependents = {
+            model: timed[generate.__name__]
+            for model, generate in manager.dependents.items()
+        }
+        for allocator in (manager.roles, manager.licenses):
+            allocator.create = timed[allocator.create.__name__]
+        for model, generate in manager.bulk_generators.items():
+            owner = generate.__self__
+            name = f"{type(owner).__name__}.{generate.__name__}"
+            manager.bulk_generators[model] = self._timed(name, generate)
+            self.bulk_names[model] = name
+            owner.write = self._counted(name, owner.write)
+        manager.generate_many = self._scoped(manager.generate_many, self.bulk_names)
+        manager.copy_many = self._scoped(manager.copy_many)
+
+    def track(self, pipeline) -> None:
+        pipeline.generate_many = self._scoped(pipeline.generate_many)
+
+    def _timed(self, name, method):
+        @wraps(method)
+        def timed(*args, **kwargs):
+            stats = self.generators[name]
+            self.stack.append(name)
+            wall, cpu = time.perf_counter(), time.process_time()
+            try:
+                result = method(*args, **kwargs)
+            finally:
+                self.stack.pop()
+                stats["wall"] += time.perf_counter() - wall
+                stats["cpu"] += time.process_time() - cpu
+            stats["calls"] += 1
+            if name not in self.counted:
+                stats["produced"] += result is not None
+            return result
+
+        return timed
+
+    def _counted(self, name, write):
+        self.counted.add(name)
+
+        @wraps(write)
+        def counted(model, columns):
+            write(model, columns)
+            if model.__table__.name == self.table:
+                self.generators[name]["produced"] += len(next(iter(columns.values())))
+
+        return counted
+
+    def _scoped(self, method, bulk={}):
+        @wraps(method)
+        def scoped(model, count, *args, **kwargs):
+            stats = self.tables[model.__table__.name]
+            self.table = model.__table__.name
+            self.generator = bulk.get(model, self.manager.generators[model].__name__)
+            wall, cpu = time.perf_counter(), time.process_time()
+            try:
+                rows = method(model, count, *args, **kwargs)
+            finally:
+                stats["wall"] += time.perf_counter() - wall
+                stats["cpu"] += time.process_time() - cpu
+                self.table = self.generator = None
+            stats["rows"] += rows
+            return rows
+
+        return scoped
+
+    def _after_execute(
+        self, conn, cursor, statement, parameters, context, executemany
+    ) -> None:
+        fetched = (
+            max(cursor.rowcount, 0) if statement.lstrip()[:6].upper() == "SELECT" else 0
+        )
+        scopes = []
+        if self.stack and threading.get_ident() == self.thread:
+            scopes.append(self.generators[self.stack[-1]])
+        if self.table:
+            scopes.append(self.tables[self.table])
+        for stats in scopes:
+            stats["statements"] += 1
+            stats["rows_fetched"] += fetched
+
+    def _commit(self, conn) -> None:
+        if not self.table:
+            return
+        self.tables[self.table]["commits"] += 1
+        if self.live and time.perf_counter() - self.printed >= self.interval:
+            self.printed = time.perf_counter()
+            stats = self.tables[self.table]
+            produced = self.generators[self.generator]["produced"]
+            print(
+                f"[{self.table}] {produced} rows produced, "
+                f"{stats['statements']} statements, {stats['commits']} commits",
+                file=sys.stderr,
+            )
+
+    def report(self) -> dict:
+        return {
+            "generators": {
+                name: {
+                    **stats,
+                    "statements_per_call": (
+                        stats["statements"] / stats["calls"] if stats["calls"] else 0
+                    ),
+                }
+                for name, stats in sorted(self.generators.items())
+            },
+            "tables": {
+                table: {
+                    **stats,
+                    "rows_per_second": (
+                        stats["rows"] / stats["wall"] if stats["wall"] else 0
+                    ),
+                    "statements_per_row": (
+                        stats["statements"] / stats["rows"] if stats["rows"] else 0
+                    ),
+                }
+                for table, stats in self.tables.items()
+            },
+            "unique": self.manager.unique.stats(),
+        }
+
+    def write(self, path) -> None:
+        with open(path, "w") as file:
+            json.dump(self.report(), file, indent=2)
+
+    def summary(self) -> None:
+        for table, stats in self.report()["tables"].items():
+            print(
+                f"{table}: {stats['rows']} rows in {stats['wall']:.2f}s "
+                f"({stats['rows_per_second']:.0f} rows/s, "
+                f"cpu {stats['cpu']:.2f}s), {stats['statements']} statements "
+                f"({stats['statements_per_row']:.2f}/row), "
+                f"{stats['rows_fetched']} rows fetched, {stats['commits']} commits"
+            )
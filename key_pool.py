@@ -0,0 +1,155 @@
+import numpy as np
+from array import array
+from datetime import datetime, timedelta
+from sqlalchemy import event, func, select
+from sqlalchemy.orm import Session
+
+TYPECODES = {int: "q", float: "d"}
+EPOCH = datetime(1970, 1, 1)
+MICROSECOND = timedelta(microseconds=1)
+
+
+class Timestamps:
+    def __init__(self):
+        self.values = array("q")
+
+    def append(self, value) -> None:
+        self.values.append((value - EPOCH) // MICROSECOND)
+
+    def __getitem__(self, index) -> datetime:
+        return EPOCH + self.values[index] * MICROSECOND
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+
+class DenseKeys:
+    def __init__(self, start, stop, gaps=()):
+        self.range = range(start, stop)
+        self.gaps = set(gaps)
+
+    def append(self, value) -> None:
+        if value >= self.range.stop:
+            self.gaps.update(range(self.range.stop, value))
+            self.range = range(self.range.start, value + 1)
+        else:
+            self.gaps.discard(value)
+
+    def pick(self, random) -> int:
+        while (value := self.range[random.randrange(len(self.range))]) in self.gaps:
+            pass
+        return value
+
+    def sample(self, rng, count) -> np.ndarray:
+        values = self.range.start + rng.integers(0, len(self.range), count)
+        if self.gaps:
+            gaps = np.fromiter(self.gaps, np.int64, len(self.gaps))
+            while (missing := np.isin(values, gaps)).any():
+                values[missing] = self.range.start + rng.integers(
+                    0, len(self.range), missing.sum()
+                )
+        return values
+
+    def __iter__(self):
+        return (value for value in self.range if value not in self.gaps)
+
+    def __len__(self) -> int:
+        return len(self.range) - len(self.gaps)
+
+
+class KeyPool:
+    def __init__(self, columns):
+        self.columns = columns
+        self.model = columns[0].class_
+        self.values = [
+            (
+                array(TYPECODES[column.type.python_type])
+                if column.type.python_type in TYPECODES
+                else Timestamps() if column.type.python_type is datetime else []
+            )
+            for column in columns
+        ]
+
+    def load(self, session: Session, density=0.9) -> "KeyPool":
+        if len(self.columns) == 1 and self.columns[0].type.python_type is int:
+            key = self.columns[0]
+            low, high, count = session.execute(
+                select(func.min(key), func.max(key), func.count(key))
+            ).one()
+            if count and count >= density * (high - low + 1):
+                self.values[0] = DenseKeys(low, high + 1, self.gaps(session, key))
+                return self
+        for row in session.execute(select(*self.columns).order_by(self.columns[0])):
+            self.append(row)
+        return self
+
+    def gaps(self, session: Session, key):
+        ordered = select(
+            key.label("key"), func.lead(key).over(order_by=key).label("next")
+        ).subquery()
+        for first, last in session.execute(
+            select(ordered.c.key + 1, ordered.c.next - 1).where(
+                ordered.c.next > ordered.c.key + 1
+            )
+        ):
+            yield from range(first, last + 1)
+
+    def append(self, row) -> None:
+        for values, value in zip(self.values, row):
+            values.append(value)
+
+    def pick(self, random):
+        if not self:
+            return None
+        if isinstance(self.values[0], DenseKeys):
+            return self.values[0].pick(random)
+        index = random.randrange(len(self))
+        if len(self.values) == 1:
+            return self.values[0][index]
+        return tuple(values[index] for values in self.values)
+
+    def sample(self, rng, count) -> np.ndarray:
+        keys = self.values[0]
+        if isinstance(keys, DenseKeys):
+            return keys.sample(rng, count)
+        return np.asarray(keys)[rng.integers(0, len(keys), count)]
+
+    def __len__(self) -> int:
+        return len(self.values[0])
+
+
+class KeyPools:
+    def __init__(self, session: Session | None):
+        self.session = session
+        self.pools: dict[tuple, KeyPool] = {}
+        if session is not None:
+            event.listen(session, "after_flush", self._after_flush)
+            event.listen(session, "after_rollback", lambda session: self.invalidate())
+
+    def get(self, *columns) -> KeyPool:
+        key = tuple((column.class_, column.key) for column in columns)
+        if key not in self.pools:
+            pool = KeyPool(columns)
+            self.pools[key] = pool.load(self.session) if self.session else pool
+        return self.pools[key]
+
+    def track(self, *columns) -> None:
+        self.get(*columns)
+
+    def invalidate(self, *models) -> None:
+        self.pools = {
+            key: pool
+            for key, pool in self.pools.items()
+            if models and pool.model not in models
+        }
+
+    def add(self, obj) -> None:
+        for pool in self.pools.values():
+            if isinstance(obj, pool.model):
+                pool.append([getattr(obj, column.key) for column in pool.columns])
+
+    def _after_flush(self, session, flush_context) -> None:
+        if not self.pools:
+            return
+        for obj in session.new:
+            self.add(obj)
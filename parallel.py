@@ -0,0 +1,105 @@
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime, time
+from sqlalchemy import create_engine, func, select, text
+from db_manager import DatabaseManager
+from partition import Partition, derive_seed
+from tables import Base
+
+
+def serial_keys() -> list:
+    return [
+        table.primary_key.columns[0]
+        for table in Base.metadata.sorted_tables
+        if len(table.primary_key.columns) == 1
+    ]
+
+
+def model_for(table_name):
+    return next(
+        mapper.class_
+        for mapper in Base.registry.mappers
+        if mapper.local_table.name == table_name
+    )
+
+
+def read_bases(engine) -> dict[str, int]:
+    with engine.connect() as conn:
+        return {
+            key.table.name: conn.scalar(select(func.coalesce(func.max(key), 0)))
+            for key in serial_keys()
+        }
+
+
+def sync_sequences(engine) -> None:
+    if engine.dialect.name != "postgresql":
+        return
+    with engine.begin() as conn:
+        for key in serial_keys():
+            conn.execute(
+                text(
+                    "SELECT setval(pg_get_serial_sequence(:table, :column), "
+                    f"(SELECT COALESCE(MAX({key.name}), 0) + 1 "
+                    f"FROM {key.table.name}), false)"
+                ),
+                {"table": key.table.name, "column": key.name},
+            )
+
+
+def generate_shard(
+    db_url, table_name, count, seed, partition, bases, now, options
+) -> int:
+    manager = DatabaseManager(
+        db_url,
+        seed=derive_seed(seed, table_name, partition.index if partition else 0),
+        partition=partition,
+        id_bases=bases,
+        now=now,
+        vocabulary_seed=seed,
+        **options,
+    )
+    try:
+        return manager.generate_many(model_for(table_name), count)
+    finally:
+        manager.session.close()
+        manager.engine.dispose()
+
+
+class ParallelGenerator:
+    def __init__(self, db_url, workers, seed=0, now=None, **options):
+        self.db_url = db_url
+        self.workers = workers
+        self.seed = seed
+        self.options = options
+        self.now = now or datetime.combine(date.today(), time())
+        self.engine = create_engine(db_url)
+        self.executor = ProcessPoolExecutor(workers)
+
+    def generate_many(self, model, count) -> int:
+        bases = read_bases(self.engine)
+        shards = [
+            count // self.workers + (index < count % self.workers)
+            for index in range(self.workers)
+        ]
+        futures = [
+            self.executor.submit(
+                generate_shard,
+                self.db_url,
+                model.__tablename__,
+                shard,
+                self.seed,
+                Partition(index, self.workers),
+                bases,
+                self.now,
+                self.options,
+            )
+            for index, shard in enumerate(shards)
+            if shard
+        ]
+        try:
+            return sum(future.result() for future in futures)
+        finally:
+            sync_sequences(self.engine)
+
+    def close(self) -> None:
+        self.executor.shutdown()
+        self.engine.dispose()
@@ -0,0 +1,93 @@
+import zlib
+from collections import Counter
+from typing import NamedTuple
+from sqlalchemy import inspect
+
+
+def stable_hash(value) -> int:
+    if isinstance(value, int):
+        return value
+    return zlib.crc32(str(value).encode())
+
+
+def derive_seed(seed, *parts) -> int:
+    return zlib.crc32(":".join(str(part) for part in (seed, *parts)).encode())
+
+
+class Partition(NamedTuple):
+    index: int
+    count: int
+
+    def owns(self, value) -> bool:
+        return stable_hash(value) % self.count == self.index
+
+    def slots(self, low, high) -> range:
+        return range(low + (self.index - low) % self.count, high, self.count)
+
+    def key_filters(self, key, bases) -> list:
+        return [
+            key % self.count == self.index,
+            key <= bases.get(key.class_.__tablename__, 0),
+        ]
+
+
+class InterleavedIds:
+    def __init__(self, bases: dict[str, int], partition: Partition):
+        self.bases = bases
+        self.partition = partition
+        self.issued = Counter()
+
+    def next(self, table) -> int:
+        k = self.issued[table]
+        self.issued[table] += 1
+        return (
+            self.bases.get(table, 0)
+            + self.partition.index
+            + 1
+            + k * self.partition.count
+        )
+
+    def take(self, key, count) -> range:
+        table = key.table.name
+        first = self.next(table)
+        self.issued[table] += count - 1
+        return range(first, first + count * self.partition.count, self.partition.count)
+
+    def reset(self) -> None:
+        self.issued = Counter()
+
+    def assign(self, session, flush_context, instances) -> None:
+        for obj in session.new:
+            self.assign_row(obj)
+
+    def assign_row(self, obj) -> None:
+        mapper = inspect(obj).mapper
+        if len(mapper.primary_key) != 1:
+            return
+        key = mapper.get_property_by_column(mapper.primary_key[0]).key
+        if getattr(obj, key) is None:
+            setattr(obj, key, self.next(mapper.local_table.name))
+
+
+class SharedTableIds:
+    def __init__(self, interleaved: InterleavedIds, sequence, shared: set[str]):
+        self.interleaved = interleaved
+        self.sequence = sequence
+        self.shared = shared
+
+    def service(self, table):
+        return self.interleaved if table in self.shared else self.sequence
+
+    def take(self, key, count):
+        return self.service(key.table.name).take(key, count)
+
+    def reset(self) -> None:
+        self.interleaved.reset()
+        self.sequence.reset()
+
+    def assign(self, session, flush_context, instances) -> None:
+        for obj in session.new:
+            self.assign_row(obj)
+
+    def assign_row(self, obj) -> None:
+        self.service(inspect(obj).mapper.local_table.name).assign_row(obj)
@@ -0,0 +1,78 @@
+import threading
+import time
+from queue import Full, Queue
+from sqlalchemy.orm import Session
+from db_manager import DatabaseManager, flush_ordered
+
+
+class GenerationPipeline:
+    def __init__(self, manager: DatabaseManager, depth=4):
+        self.manager = manager
+        self.depth = depth
+        self.stats: dict[str, list] = {}
+
+    def generate_many(self, model, count, batch_size=None) -> int:
+        queue = Queue(self.depth)
+        failed = threading.Event()
+        errors = []
+        writer = threading.Thread(
+            target=self._write, args=(queue, failed, errors), daemon=True
+        )
+        writer.start()
+        generated = 0
+        start = time.perf_counter()
+        try:
+            for batch, rows in self.manager.generate_batches(model, count, batch_size):
+                if not self._put(queue, rows, failed):
+                    break
+                generated += len(batch)
+        except BaseException:
+            failed.set()
+            raise
+        finally:
+            queue.put(None)
+            writer.join()
+            self.manager.session.commit()
+            if failed.is_set():
+                self.manager.reset_caches()
+            else:
+                self.manager.key_pools.invalidate()
+        if errors:
+            raise errors[0]
+        stats = self.stats.setdefault(model.__table__.name, [0, 0.0])
+        stats[0] += generated
+        stats[1] += time.perf_counter() - start
+        return generated
+
+    def _put(self, queue, rows, failed) -> bool:
+        while not failed.is_set():
+            try:
+                queue.put(rows, timeout=0.1)
+                return True
+            except Full:
+                continue
+        return False
+
+    def _write(self, queue, failed, errors) -> None:
+        with Session(self.manager.engine, expire_on_commit=False) as session:
+            while (rows := queue.get()) is not None:
+                if failed.is_set():
+                    continue
+                try:
+                    flush_ordered(session, rows)
+                    session.commit()
+                    session.expunge_all()
+                except BaseException as error:
+                    session.rollback()
+                    errors.append(error)
+                    failed.set()
+
+    def report(self) -> None:
+        for table, (rows, seconds) in self.stats.items():
+            print(
+                f"{table}: {rows} rows in {seconds:.2f}s "
+                f"({rows / seconds if seconds else 0:.0f} rows/s)"
+            )
+
+    def close(self) -> None:
+        pass
@@ -0,0 +1,289 @@
+import argparse
+import difflib
+import json
+import os
+import re
+import time as timer
+from datetime import datetime
+import numpy as np
+from sqlalchemy import bindparam, inspect, text
+from db_manager import DatabaseManager
+from querries import REPORTS, generateSql
+from report_runner import ReportRunner
+from scale import DEFAULT_URL, run
+from tables import Base
+
+CONDITIONS = ("Filter", "Hash Cond", "Merge Cond", "Join Filter")
+
+
+def plan_nodes(plan, ancestors=()):
+    yield plan, ancestors
+    for child in plan.get("Plans", []):
+        yield from plan_nodes(child, (plan, *ancestors))
+
+
+def plan_shape(plan, depth=0) -> list[str]:
+    line = "  " * depth + plan["Node Type"]
+    if "Relation Name" in plan:
+        line += f" on {plan['Relation Name']}"
+    if "Index Name" in plan:
+        line += f" using {plan['Index Name']}"
+    lines = [line]
+    for child in plan.get("Plans", []):
+        lines.extend(plan_shape(child, depth + 1))
+    return lines
+
+
+def table_rows(session) -> dict[str, int]:
+    return dict(
+        session.execute(
+            text(
+                "SELECT relname, reltuples::bigint FROM pg_class "
+                "WHERE relkind = 'r' AND relname IN :tables"
+            ).bindparams(bindparam("tables", expanding=True)),
+            {"tables": list(Base.metadata.tables)},
+        ).all()
+    )
+
+
+def indexed_columns(engine) -> dict[str, set]:
+    inspector = inspect(engine)
+    indexed = {}
+    for table in Base.metadata.tables:
+        leading = {
+            index["column_names"][0]
+            for index in inspector.get_indexes(table)
+            + inspector.get_unique_constraints(table)
+            if index["column_names"]
+        }
+        primary = inspector.get_pk_constraint(table)["constrained_columns"]
+        indexed[table] = leading | set(primary[:1])
+    return indexed
+
+
+def scan_conditions(node, ancestors) -> tuple[str, str]:
+    own = " ".join(str(node[key]) for key in CONDITIONS if key in node)
+    joined = []
+    for ancestor in ancestors:
+        joined.extend(str(ancestor[key]) for key in CONDITIONS if key in ancestor)
+        if ancestor["Node Type"] != "Hash":
+            break
+    return own, " ".join(joined)
+
+
+def seq_scans(plan, rows, indexed, min_rows) -> list[dict]:
+    flagged = []
+    for node, ancestors in plan_nodes(plan):
+        table = node.get("Relation Name")
+        if node["Node Type"] != "Seq Scan" or rows.get(table, 0) < min_rows:
+            continue
+        own, joined = scan_conditions(node, ancestors)
+        alias = re.escape(node.get("Alias", table))
+        columns = [
+            column.name
+            for column in Base.metadata.tables[table].columns
+            if column.name not in indexed.get(table, ())
+            and (
+                re.search(rf"\b{column.name}\b", own)
+                or re.search(rf"\b{alias}\.{column.name}\b", joined)
+            )
+        ]
+        flagged.append(
+            {
+                "table": table,
+                "rows": rows[table],
+                "columns": columns,
+                "suggestion": [
+                    f"CREATE INDEX ON {table} ({column})" for column in columns
+                ],
+            }
+        )
+    return flagged
+
+
+class QueryBenchmark:
+    def __init__(self, db_url, reports=None, repeat=20, warmup=2, min_rows=100000):
+        self.db_url = db_url
+        self.reports = reports or REPORTS
+        self.repeat = repeat
+        self.warmup = warmup
+        self.min_rows = min_rows
+
+    def run(self) -> dict:
+        manager = DatabaseManager(self.db_url)
+        explain = manager.engine.dialect.name == "postgresql"
+        try:
+            if explain:
+                manager.session.execute(text("ANALYZE"))
+                manager.session.commit()
+                rows = table_rows(manager.session)
+                indexed = indexed_columns(manager.engine)
+            runner = ReportRunner(manager, self.reports)
+            results = {}
+            for name, build in self.reports.items():
+                result = self.time(runner, name)
+                if explain:
+                    result.update(
+                        self.explain(manager, build(manager), rows, indexed),
+                    )
+                results[name] = result
+            return results
+        finally:
+            manager.session.close()
+            manager.engine.dispose()
+
+    def time(self, runner, name) -> dict:
+        latencies = []
+        for attempt in range(self.warmup + self.repeat):
+            start = timer.perf_counter()
+            fetched = sum(len(chunk) for chunk in runner.chunks(name))
+            if attempt >= self.warmup:
+                latencies.append((timer.perf_counter() - start) * 1000)
+        p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+        return {
+            "rows": fetched,
+            "mean_ms": float(np.mean(latencies)),
+            "p50_ms": float(p50),
+            "p95_ms": float(p95),
+            "p99_ms": float(p99),
+        }
+
+    def explain(self, manager, query, rows, indexed) -> dict:
+        (explained,) = manager.session.execute(
+            text(
+                "EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) " + generateSql(manager, query)
+            )
+        ).scalar()
+        manager.session.rollback()
+        plan = explained["Plan"]
+        return {
+            "planning_ms": explained["Planning Time"],
+            "execution_ms": explained["Execution Time"],
+            "shared_hit_blocks": plan.get("Shared Hit Blocks", 0),
+            "shared_read_blocks": plan.get("Shared Read Blocks", 0),
+            "shape": plan_shape(plan),
+            "seq_scans": seq_scans(plan, rows, indexed, self.min_rows),
+            "plan": plan,
+        }
+
+
+def benchmark(scales, db_url, label=None, output="benchmarks", **options) -> dict:
+    bench = QueryBenchmark(
+        db_url,
+        **{
+            key: options.pop(key)
+            for key in ("reports", "repeat", "warmup", "min_rows")
+            if key in options
+        },
+    )
+    results = {
+        "label": label or datetime.now().strftime("%Y%m%d-%H%M%S"),
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "runs": [],
+    }
+    for scale in scales:
+        loaded = run(scale, db_url, **options) if scale is not None else {}
+        reports = bench.run()
+        results["runs"].append(
+            {"scale": scale, "rows": loaded.get("rows"), "reports": reports}
+        )
+        for name, result in reports.items():
+            print(
+                f"SF {scale} {name}: {result['rows']} rows, "
+                f"p50 {result['p50_ms']:.1f}ms, p95 {result['p95_ms']:.1f}ms, "
+                f"p99 {result['p99_ms']:.1f}ms"
+            )
+            for scan in result.get("seq_scans", []):
+                print(
+                    f"  Seq Scan on {scan['table']} ({scan['rows']} rows)"
+                    + "".join(f"\n    {hint}" for hint in scan["suggestion"])
+                )
+    os.makedirs(output, exist_ok=True)
+    path = os.path.join(output, f"{results['label']}.json")
+    with open(path, "w") as file:
+        json.dump(results, file, indent=2)
+    print(f"Results written to {path}")
+    return results
+
+
+def compare(old: dict, new: dict, tolerance=1.2) -> list[str]:
+    changes = []
+    baseline = {run["scale"]: run["reports"] for run in old["runs"]}
+    for run in new["runs"]:
+        for name, result in run["reports"].items():
+            before = baseline.get(run["scale"], {}).get(name)
+            if before is None:
+                continue
+            where = f"SF {run['scale']} {name}"
+            ratio = result["p50_ms"] / before["p50_ms"] if before["p50_ms"] else 1.0
+            if ratio > tolerance:
+                changes.append(
+                    f"{where}: p50 regressed {before['p50_ms']:.1f}ms -> "
+                    f"{result['p50_ms']:.1f}ms ({ratio:.2f}x)"
+                )
+            elif ratio < 1 / tolerance:
+                changes.append(
+                    f"{where}: p50 improved {before['p50_ms']:.1f}ms -> "
+                    f"{result['p50_ms']:.1f}ms ({ratio:.2f}x)"
+                )
+            diff = list(
+                difflib.unified_diff(
+                    before.get("shape", []),
+                    result.get("shape", []),
+                    old["label"],
+                    new["label"],
+                    lineterm="",
+                )
+            )
+            if diff:
+                changes.append(f"{where}: plan changed\n" + "\n".join(diff))
+    return changes
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Time the registered report queries across scale factors."
+    )
+    parser.add_argument("--db-url", default=DEFAULT_URL)
+    parser.add_argument("--scales", default="1", help="comma-separated scales")
+    parser.add_argument(
+        "--existing", action="store_true", help="benchmark the data already loaded"
+    )
+    parser.add_argument("--reports", help="comma-separated report names")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--warmup", type=int, default=2)
+    parser.add_argument("--min-rows", type=int, default=100000)
+    parser.add_argument("--label")
+    parser.add_argument("--output", default="benchmarks")
+    parser.add_argument("--compare", help="earlier results file to diff against")
+    parser.add_argument("--tolerance", type=float, default=1.2)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--copy", dest="use_copy", action="store_true")
+    parser.add_argument("--bulk", action="store_true")
+    args = parser.parse_args()
+    results = benchmark(
+        (
+            [None]
+            if args.existing
+            else [float(scale) for scale in args.scales.split(",")]
+        ),
+        args.db_url,
+        args.label,
+        args.output,
+        reports=args.reports
+        and {name: REPORTS[name] for name in args.reports.split(",")},
+        repeat=args.repeat,
+        warmup=args.warmup,
+        min_rows=args.min_rows,
+        seed=args.seed,
+        use_copy=args.use_copy,
+        bulk=args.bulk,
+    )
+    if args.compare:
+        with open(args.compare) as file:
+            changes = compare(json.load(file), results, args.tolerance)
+        print("\n".join(changes) or "No changes beyond tolerance.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+import argparse
+import csv
+from contextlib import contextmanager
+from copy_loader import copy_value
+from db_manager import DatabaseManager
+from querries import REPORTS
+from scale import DEFAULT_URL
+
+
+class ReportRunner:
+    def __init__(self, manager, reports=None, chunk_size=10000):
+        self.manager = manager
+        self.reports = reports or REPORTS
+        self.chunk_size = chunk_size
+        self.statements = {}
+        self.compiled_cache = {}
+
+    def statement(self, name):
+        if name not in self.statements:
+            self.statements[name] = self.reports[name](self.manager).statement
+        return self.statements[name]
+
+    @contextmanager
+    def execute(self, name, **params):
+        with self.manager.engine.connect() as conn:
+            yield conn.execution_options(
+                yield_per=self.chunk_size, compiled_cache=self.compiled_cache
+            ).execute(self.statement(name), params)
+
+    def chunks(self, name, **params):
+        with self.execute(name, **params) as result:
+            yield from result.partitions()
+
+    def rows(self, name, **params):
+        for chunk in self.chunks(name, **params):
+            yield from chunk
+
+    def write_csv(self, name, path, **params) -> int:
+        written = 0
+        with self.execute(name, **params) as result, open(
+            path, "w", newline=""
+        ) as file:
+            writer = csv.writer(file, lineterminator="\n")
+            writer.writerow(result.keys())
+            for chunk in result.partitions():
+                writer.writerows([copy_value(value) for value in row] for row in chunk)
+                written += len(chunk)
+        return written
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Stream a registered report to a CSV file."
+    )
+    parser.add_argument("report", choices=sorted(REPORTS))
+    parser.add_argument("path")
+    parser.add_argument("--db-url", default=DEFAULT_URL)
+    parser.add_argument("--chunk-size", type=int, default=10000)
+    args = parser.parse_args()
+    manager = DatabaseManager(args.db_url)
+    runner = ReportRunner(manager, chunk_size=args.chunk_size)
+    print(f"{runner.write_csv(args.report, args.path)} rows written to {args.path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,30 @@
+from sqlalchemy import select, union
+from sqlalchemy.orm import Session
+from id_allocator import FreeKeyAllocator
+from tables import AppUser, Driver, Editor, Passenger, TicketInspector
+
+ROLES = (Driver, Passenger, TicketInspector, Editor)
+
+
+class RoleAllocator(FreeKeyAllocator):
+    def __init__(
+        self,
+        session: Session | None,
+        generate_user,
+        store,
+        random,
+        top_up_size=1000,
+        filters=(),
+        keys=None,
+    ):
+        super().__init__(
+            session,
+            AppUser.id_user,
+            union(*(select(role.fk_user) for role in ROLES)),
+            generate_user,
+            store,
+            random,
+            top_up_size,
+            filters,
+            keys,
+        )
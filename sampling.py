@@ -0,0 +1,138 @@
+import numpy as np
+from datetime import datetime
+from tables import *
+
+
+class Weighted:
+    def __init__(self, weights: dict):
+        self.values = np.empty(len(weights), dtype=object)
+        self.values[:] = list(weights)
+        cumulative = np.cumsum(list(weights.values()), dtype=np.float64)
+        self.cumulative = cumulative / cumulative[-1]
+
+    def sample(self, rng, count) -> np.ndarray:
+        return self.values[
+            np.searchsorted(self.cumulative, rng.random(count), side="right")
+        ]
+
+
+class Choice(Weighted):
+    def __init__(self, values):
+        super().__init__({value: 1 for value in values})
+
+
+class IntRange:
+    def __init__(self, min, max, step=1):
+        self.min = min
+        self.max = max
+        self.step = step
+
+    def sample(self, rng, count) -> np.ndarray:
+        slots = (self.max - self.min) // self.step + 1
+        return rng.integers(0, slots, count) * self.step + self.min
+
+
+class Chance:
+    def __init__(self, percent):
+        self.probability = percent / 100
+
+    def sample(self, rng, count) -> np.ndarray:
+        return rng.random(count) < self.probability
+
+
+class Between:
+    def __init__(self, start: datetime, end: datetime):
+        self.start = np.datetime64(start, "us")
+        self.end = np.datetime64(end, "us")
+
+    def sample(self, rng, count) -> np.ndarray:
+        span = (self.end - self.start).astype(np.int64)
+        return self.start + rng.integers(0, span + 1, count).astype("timedelta64[us]")
+
+
+class Interval(Between):
+    def sample(self, rng, count) -> np.ndarray:
+        starts = super().sample(rng, count)
+        remaining = (self.end - starts).astype(np.int64)
+        ends = starts + (rng.random(count) * remaining).astype("timedelta64[us]")
+        return np.column_stack([starts, ends])
+
+
+class Shifted:
+    def __init__(self, base: Between, days):
+        self.base = base
+        self.days = days
+
+    def sample(self, rng, count) -> np.ndarray:
+        starts = self.base.sample(rng, count)
+        return np.column_stack(
+            [starts, starts + self.days.sample(rng, count).astype("timedelta64[D]")]
+        )
+
+
+def timestamp_columns(now: datetime) -> dict:
+    period = Between(datetime(now.year - now.year % 10, 1, 1), now)
+    return {
+        "vehicles.dates": Interval(period.start, period.end),
+        "drivers_licenses.dates": Shifted(
+            period, COLUMNS["drivers_licenses.validity_days"]
+        ),
+        "fines.dates": Shifted(period, IntRange(90, 90)),
+        "purchases.date": period,
+        "technical_issues.dates": Interval(period.start, period.end),
+    }
+
+
+COLUMNS = {
+    "vehicles.type": Weighted({VehicleTypeEnum.Bus: 0.8, VehicleTypeEnum.Tram: 0.2}),
+    "vehicles.status": Weighted(
+        {VehicleStatusEnum.Inactive: 0.1, VehicleStatusEnum.Active: 0.9}
+    ),
+    "vehicles.air_conditioning": Chance(75),
+    "vehicles.capacity": Choice([30, 50, 70, 80, 90, 100]),
+    "drivers_licenses.validity_days": IntRange(6 * 365, 180 * 365, step=30),
+    "fines.status": Weighted({FineStatusEnum.Paid: 0.95, FineStatusEnum.Unpaid: 0.05}),
+    "stops.type": Weighted(
+        {
+            StopTypesEnum.Bus: 0.6,
+            StopTypesEnum.Tram: 0.2,
+            StopTypesEnum.BusTram: 0.2,
+        }
+    ),
+    "stops.seating_available": Chance(80),
+    "stops.shelter": Chance(75),
+    "stops.coordinate_offset": IntRange(-250000, 250000),
+    "paths.distance": IntRange(5, 50),
+    "paths.number_of_stops": IntRange(15, 30),
+    "lines.number": IntRange(0, 999),
+    "lines.number_suffix": Weighted(
+        {"A": 0.2, "B": 0.02, "C": 0.02, "D": 0.02, "": 0.92}
+    ),
+    "lines.avg_frequency": IntRange(5, 90),
+    "inspections.minutes_into_ride": IntRange(0, 30),
+    "technical_issues.status": Weighted(
+        {
+            TechnicalIssueStatusEnum.Reported: 0.1,
+            TechnicalIssueStatusEnum.InProgress: 0.1,
+            TechnicalIssueStatusEnum.Resolved: 0.8,
+        }
+    ),
+    "technical_issues.repair_cost": IntRange(50, 5000),
+}
+
+
+class Sampler:
+    def __init__(self, seed, block_size=4096, columns=None):
+        self.rng = np.random.default_rng(seed)
+        self.block_size = block_size
+        self.columns = {**COLUMNS, **(columns or {})}
+        self.buffers: dict[str, list] = {}
+
+    def column(self, name, count) -> np.ndarray:
+        return self.columns[name].sample(self.rng, count)
+
+    def draw(self, name):
+        buffer = self.buffers.get(name)
+        if not buffer:
+            buffer = self.buffers[name] = self.column(name, self.block_size).tolist()
+        return buffer.pop()
@@ -0,0 +1,187 @@
+import time as timer
+from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from datetime import date, datetime, time
+from sqlalchemy import create_engine
+from parallel import generate_shard, read_bases, sync_sequences
+from partition import Partition
+from tables import *
+
+WRITES = {
+    AppUser: (AppUser,),
+    Driver: (Driver, AppUser, DriversLicense),
+    Passenger: (Passenger, AppUser),
+    TicketInspector: (TicketInspector, AppUser),
+    Editor: (Editor, AppUser),
+    Ticket: (Ticket, Purchase),
+    Path: (Path, PathStop),
+}
+
+
+def written_tables(model) -> set:
+    return {written.__table__ for written in WRITES.get(model, (model,))}
+
+
+def parent_tables(model) -> set:
+    return {
+        fk.column.table for table in written_tables(model) for fk in table.foreign_keys
+    } - {model.__table__}
+
+
+def dependency_order(models) -> list:
+    ordered = []
+    pending = list(models)
+    while pending:
+        ready = [
+            model
+            for model in pending
+            if not any(
+                other is not model and other.__table__ in parent_tables(model)
+                for other in pending
+            )
+        ]
+        if not ready:
+            raise ValueError("Circular dependency between planned tables")
+        ordered.extend(ready)
+        pending = [model for model in pending if model not in ready]
+    return ordered
+
+
+class TableScheduler:
+    def __init__(
+        self,
+        db_url,
+        plan: dict,
+        workers=None,
+        seed=0,
+        now=None,
+        executor_class=ProcessPoolExecutor,
+        **options,
+    ):
+        self.db_url = db_url
+        self.plan = {model: count for model, count in plan.items() if count}
+        self.workers = workers
+        self.seed = seed
+        self.now = now or datetime.combine(date.today(), time())
+        self.executor_class = executor_class
+        self.options = options
+        self.engine = create_engine(db_url)
+        self.parents = {
+            model: {
+                parent
+                for parent in self.plan
+                if parent is not model and parent.__table__ in parent_tables(model)
+            }
+            for model in self.plan
+        }
+        self.groups = self.conflict_groups()
+        self.group_of = {
+            model: index for index, group in enumerate(self.groups) for model in group
+        }
+        self.timings: dict = {}
+
+    def ancestors(self, model) -> set:
+        found = set()
+        stack = list(self.parents[model])
+        while stack:
+            parent = stack.pop()
+            if parent not in found:
+                found.add(parent)
+                stack.extend(self.parents[parent])
+        return found
+
+    def conflict_groups(self) -> list[list]:
+        groups = []
+        for model in self.plan:
+            group = next(
+                (
+                    group
+                    for group in groups
+                    if any(
+                        written_tables(model) & written_tables(member)
+                        and member not in self.ancestors(model)
+                        and model not in self.ancestors(member)
+                        for member in group
+                    )
+                ),
+                None,
+            )
+            if group is None:
+                groups.append([model])
+            else:
+                group.append(model)
+        return groups
+
+    def shared_tables(self, group) -> set[str]:
+        written = Counter(
+            table.name
+            for model in self.groups[group]
+            for table in written_tables(model)
+        )
+        return {table for table, writers in written.items() if writers > 1}
+
+    def run(self) -> dict:
+        results = {}
+        running = {}
+        group_bases = {}
+        start = timer.perf_counter()
+        with self.executor_class(self.workers) as executor:
+            while len(results) < len(self.plan):
+                for model in self.plan:
+                    if (
+                        model in results
+                        or model in running.values()
+                        or not self.parents[model] <= results.keys()
+                    ):
+                        continue
+                    group = self.group_of[model]
+                    partition = None
+                    options = self.options
+                    if len(self.groups[group]) > 1:
+                        if group not in group_bases:
+                            group_bases[group] = read_bases(self.engine)
+                        partition = Partition(
+                            self.groups[group].index(model), len(self.groups[group])
+                        )
+                        options = {
+                            **self.options,
+                            "shared_tables": self.shared_tables(group),
+                        }
+                    future = executor.submit(
+                        generate_shard,
+                        self.db_url,
+                        model.__tablename__,
+                        self.plan[model],
+                        self.seed,
+                        partition,
+                        group_bases.get(group),
+                        self.now,
+                        options,
+                    )
+                    running[future] = model
+                    self.timings[model] = [timer.perf_counter() - start, None]
+                if not running:
+                    raise ValueError("Circular dependency between planned tables")
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    model = running.pop(future)
+                    results[model] = future.result()
+                    self.timings[model][1] = timer.perf_counter() - start
+                    group = self.groups[self.group_of[model]]
+                    if len(group) > 1 and all(member in results for member in group):
+                        sync_sequences(self.engine)
+        self.report()
+        return results
+
+    def report(self) -> None:
+        total = 0.0
+        for model, (started, finished) in sorted(
+            self.timings.items(), key=lambda item: item[1][0]
+        ):
+            total += finished - started
+            print(
+                f"{model.__tablename__}: {started:.2f}s - {finished:.2f}s "
+                f"({finished - started:.2f}s)"
+            )
+        wall = max(finished for (_, finished) in self.timings.values())
+        print(f"Wall time {wall:.2f}s, sum of tables {total:.2f}s")
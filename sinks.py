@@ -0,0 +1,137 @@
+import csv
+import os
+from decimal import Decimal
+from enum import Enum
+from sqlalchemy import DECIMAL, Boolean, DateTime, Float, Integer, inspect
+from copy_loader import copy_value
+
+FORMATS = ("csv", "parquet")
+
+
+class FileSink:
+    def __init__(self, directory, format="csv", chunk_size=10000):
+        if format not in FORMATS:
+            raise ValueError(f"Unsupported export format: {format}")
+        if format == "parquet":
+            try:
+                import pyarrow
+            except ImportError:
+                raise ValueError("Parquet export requires pyarrow") from None
+        self.directory = directory
+        self.format = format
+        self.chunk_size = chunk_size
+        self.buffers: dict = {}
+        self.files: dict = {}
+        self.rows = {}
+        os.makedirs(directory, exist_ok=True)
+
+    def write(self, obj) -> None:
+        model = type(obj)
+        buffer = self.buffers.setdefault(model, [])
+        buffer.append(
+            [getattr(obj, column.key) for column in inspect(model).column_attrs]
+        )
+        if len(buffer) >= self.chunk_size:
+            self.flush(model)
+
+    def write_columns(self, model, columns: dict) -> None:
+        count = len(next(iter(columns.values())))
+        buffer = self.buffers.setdefault(model, [])
+        buffer.extend(
+            zip(
+                *(
+                    columns.get(column.key, [None] * count)
+                    for column in inspect(model).column_attrs
+                )
+            )
+        )
+        if len(buffer) >= self.chunk_size:
+            self.flush(model)
+
+    def flush(self, model) -> None:
+        rows = self.buffers.pop(model, [])
+        if not rows:
+            return
+        table = model.__table__
+        self.rows[table.name] = self.rows.get(table.name, 0) + len(rows)
+        if self.format == "csv":
+            self._write_csv(model, rows)
+        else:
+            self._write_parquet(model, rows)
+
+    def close(self) -> None:
+        for model in list(self.buffers):
+            self.flush(model)
+        for file in self.files.values():
+            file.close()
+        self.files = {}
+
+    def report(self) -> None:
+        for table, rows in self.rows.items():
+            print(f"{table}: {rows} rows")
+
+    def _path(self, model) -> str:
+        return os.path.join(self.directory, f"{model.__table__.name}.{self.format}")
+
+    def _columns(self, model) -> list:
+        return [column.columns[0] for column in inspect(model).column_attrs]
+
+    def _write_csv(self, model, rows) -> None:
+        if model not in self.files:
+            self.files[model] = open(self._path(model), "w", newline="")
+            csv.writer(self.files[model], lineterminator="\n").writerow(
+                [column.name for column in self._columns(model)]
+            )
+        writer = csv.writer(self.files[model], lineterminator="\n")
+        for row in rows:
+            writer.writerow([copy_value(value) for value in row])
+
+    def _write_parquet(self, model, rows) -> None:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        columns = self._columns(model)
+        types = [arrow_type(pa, column.type) for column in columns]
+        if model not in self.files:
+            self.files[model] = pq.ParquetWriter(
+                self._path(model),
+                pa.schema(
+                    [
+                        pa.field(column.name, type, column.nullable)
+                        for column, type in zip(columns, types)
+                    ]
+                ),
+            )
+        self.files[model].write_table(
+            pa.table(
+                [
+                    pa.array(
+                        [arrow_value(row[index], column.type) for row in rows], type
+                    )
+                    for index, (column, type) in enumerate(zip(columns, types))
+                ],
+                schema=self.files[model].schema,
+            )
+        )
+
+
+def arrow_type(pa, type):
+    if isinstance(type, Boolean):
+        return pa.bool_()
+    if isinstance(type, Integer):
+        return pa.int64()
+    if isinstance(type, DECIMAL):
+        return pa.decimal128(type.precision, type.scale)
+    if isinstance(type, Float):
+        return pa.float64()
+    if isinstance(type, DateTime):
+        return pa.timestamp("us")
+    return pa.string()
+
+
+def arrow_value(value, type):
+    if isinstance(value, Enum):
+        return value.name
+    if value is not None and isinstance(type, DECIMAL):
+        return Decimal(str(value))
+    return value
@@ -0,0 +1,153 @@
+import os
+import re
+import subprocess
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import make_url
+from tables import Base
+
+METHODS = ("template", "dump")
+
+
+def truncate_tables(engine) -> None:
+    tables = Base.metadata.sorted_tables
+    with engine.begin() as conn:
+        if engine.dialect.name == "postgresql":
+            conn.execute(
+                text(
+                    f"TRUNCATE {', '.join(table.name for table in tables)} "
+                    "RESTART IDENTITY CASCADE"
+                )
+            )
+            return
+        for table in reversed(tables):
+            conn.execute(table.delete())
+
+
+class Snapshots:
+    def __init__(self, db_url, directory="snapshots", jobs=4):
+        self.url = make_url(db_url)
+        self.directory = directory
+        self.jobs = jobs
+        self.admin = create_engine(
+            self.url.set(database="postgres"), isolation_level="AUTOCOMMIT"
+        )
+        self.quote = self.admin.dialect.identifier_preparer.quote
+
+    def database(self, name) -> str:
+        if not re.fullmatch(r"\w+", name):
+            raise ValueError(f"Invalid snapshot name: {name}")
+        return f"{self.url.database}__{name}"
+
+    def path(self, name) -> str:
+        return os.path.join(self.directory, f"{self.database(name)}.dump")
+
+    def save(self, name, method="template") -> None:
+        if method == "template":
+            self._terminate(self.url.database)
+            self._execute(f"DROP DATABASE IF EXISTS {self.quote(self.database(name))}")
+            self._execute(
+                f"CREATE DATABASE {self.quote(self.database(name))} "
+                f"TEMPLATE {self.quote(self.url.database)}"
+            )
+        elif method == "dump":
+            os.makedirs(self.directory, exist_ok=True)
+            self._run("pg_dump", "--format=custom", f"--file={self.path(name)}")
+        else:
+            raise ValueError(f"Unknown snapshot method: {method}")
+
+    def restore(self, name, method="template") -> None:
+        if method == "template":
+            if not self._exists(self.database(name)):
+                raise ValueError(f"No snapshot database named {name}")
+            working = self.quote(self.url.database)
+            restoring = self.quote(f"{self.url.database}_restoring")
+            replaced = self.quote(f"{self.url.database}_replaced")
+            self._terminate(self.database(name))
+            self._execute(f"DROP DATABASE IF EXISTS {restoring}")
+            self._execute(
+                f"CREATE DATABASE {restoring} "
+                f"TEMPLATE {self.quote(self.database(name))}"
+            )
+            self._execute(f"DROP DATABASE IF EXISTS {replaced}")
+            self._terminate(self.url.database)
+            self._execute(f"ALTER DATABASE {working} RENAME TO {replaced}")
+            self._execute(f"ALTER DATABASE {restoring} RENAME TO {working}")
+            self._execute(f"DROP DATABASE {replaced}")
+        elif method == "dump":
+            if not os.path.exists(self.path(name)):
+                raise ValueError(f"No snapshot named {name}")
+            self._terminate(self.url.database)
+            self._run(
+                "pg_restore",
+                "--clean",
+                "--if-exists",
+                "--no-owner",
+                f"--jobs={self.jobs}",
+                self.path(name),
+            )
+        else:
+            raise ValueError(f"Unknown snapshot method: {method}")
+
+    def drop(self, name) -> None:
+        self._terminate(self.database(name))
+        self._execute(f"DROP DATABASE IF EXISTS {self.quote(self.database(name))}")
+        if os.path.exists(self.path(name)):
+            os.remove(self.path(name))
+
+    def names(self) -> list[str]:
+        prefix = f"{self.url.database}__"
+        with self.admin.connect() as conn:
+            databases = conn.scalars(
+                text("SELECT datname FROM pg_database WHERE datname LIKE :pattern"),
+                {"pattern": prefix.replace("_", "\\_") + "%"},
+            ).all()
+        files = (
+            [
+                file.removesuffix(".dump")
+                for file in os.listdir(self.directory)
+                if file.startswith(prefix) and file.endswith(".dump")
+            ]
+            if os.path.isdir(self.directory)
+            else []
+        )
+        return sorted({name.removeprefix(prefix) for name in (*databases, *files)})
+
+    def close(self) -> None:
+        self.admin.dispose()
+
+    def _execute(self, statement) -> None:
+        with self.admin.connect() as conn:
+            conn.execute(text(statement))
+
+    def _exists(self, database) -> bool:
+        with self.admin.connect() as conn:
+            return bool(
+                conn.scalar(
+                    text("SELECT 1 FROM pg_database WHERE datname = :database"),
+                    {"database": database},
+                )
+            )
+
+    def _terminate(self, database) -> None:
+        with self.admin.connect() as conn:
+            conn.execute(
+                text(
+                    "SELECT pg_terminate_backend(pid) FROM pg_stat_activity "
+                    "WHERE datname = :database AND pid <> pg_backend_pid()"
+                ),
+                {"database": database},
+            )
+
+    def _run(self, program, *args) -> None:
+        subprocess.run(
+            [
+                program,
+                f"--host={self.url.host or 'localhost'}",
+                f"--port={self.url.port or 5432}",
+                f"--username={self.url.username}",
+                f"--dbname={self.url.database}",
+                *args,
+            ],
+            env={**os.environ, "PGPASSWORD": self.url.password or ""},
+            check=True,
+        )
@@ -0,0 +1,86 @@
+import numpy as np
+from key_pool import KeyPool
+
+
+class StopIndex:
+    def __init__(self, pool: KeyPool, stops_per_cell=8):
+        ids, latitudes, longitudes = pool.values
+        self.pool = pool
+        self.size = len(pool)
+        self.ids = np.asarray(ids, dtype=np.int64)
+        self.coords = np.column_stack(
+            [np.asarray(latitudes, dtype=np.float64), np.asarray(longitudes)]
+        )
+        self.origin = self.coords.min(axis=0)
+        extent = np.maximum(self.coords.max(axis=0) - self.origin, 1e-9)
+        self.cell_size = float(
+            np.sqrt(extent[0] * extent[1] * stops_per_cell / len(self.ids))
+        )
+        self.cells = np.floor((self.coords - self.origin) / self.cell_size).astype(
+            np.int64
+        )
+        self.span = int(self.cells.max()) + 1
+        order = np.lexsort((self.cells[:, 1], self.cells[:, 0]))
+        keys, starts = np.unique(self.cells[order], axis=0, return_index=True)
+        self.grid = {
+            (int(x), int(y)): indices
+            for (x, y), indices in zip(keys, np.split(order, starts[1:]))
+        }
+        self.neighbourhoods = {}
+        self.visited = np.zeros(len(self.ids), dtype=bool)
+
+    def is_current(self, pool: KeyPool) -> bool:
+        return self.pool is pool and self.size == len(pool)
+
+    def walk(self, count, random, neighbours=4) -> list[int]:
+        first = random.randrange(len(self.ids))
+        path = [first]
+        visited = self.visited
+        visited[first] = True
+        current = first
+        try:
+            while len(path) < count:
+                candidates = self.nearest(current, visited, neighbours)
+                current = int(candidates[random.randrange(len(candidates))])
+                path.append(current)
+                visited[current] = True
+        finally:
+            visited[path] = False
+        rest = np.array(path[1:], dtype=np.int64)
+        offsets = self.coords[rest] - self.coords[first]
+        rest = rest[np.argsort(np.hypot(offsets[:, 0], offsets[:, 1]), kind="stable")]
+        return [int(self.ids[first])] + self.ids[rest].tolist()
+
+    def nearest(self, index, excluded, count) -> np.ndarray:
+        x, y = self.cells[index]
+        radius = 1
+        while True:
+            candidates = self.neighbourhood(int(x), int(y), radius)
+            candidates = candidates[~excluded[candidates]]
+            if len(candidates) >= count or radius > self.span:
+                break
+            radius += 1
+        offsets = self.coords[candidates] - self.coords[index]
+        distances = np.hypot(offsets[:, 0], offsets[:, 1])
+        if len(candidates) > count:
+            candidates = candidates[np.argpartition(distances, count)[:count]]
+        return candidates
+
+    def neighbourhood(self, x, y, radius) -> np.ndarray:
+        key = (x, y, radius)
+        if key not in self.neighbourhoods:
+            self.neighbourhoods[key] = np.concatenate(
+                [
+                    self.grid[cell]
+                    for cell in (
+                        (x + dx, y + dy)
+                        for dx in range(-radius, radius + 1)
+                        for dy in range(-radius, radius + 1)
+                    )
+                    if cell in self.grid
+                ]
+            )
+        return self.neighbourhoods[key]
+
+    def __len__(self) -> int:
+        return len(self.ids)
@@ -0,0 +1,67 @@
+import numpy as np
+from tables import Passenger, Purchase, Ticket, TicketType
+
+
+class PriceTable:
+    def __init__(self, ids, prices):
+        self.ids = np.asarray(ids, dtype=np.int64)
+        self.prices = np.asarray(prices, dtype=np.float64)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+
+class TicketSales:
+    def __init__(self, manager):
+        self.manager = manager
+
+    def prices(self) -> PriceTable:
+        if self.manager.price_table is None:
+            pool = self.manager.key_pools.get(
+                TicketType.id_ticket_type, TicketType.price
+            )
+            self.manager.price_table = PriceTable(*pool.values)
+        return self.manager.price_table
+
+    def generate(self, count, batch_size=None) -> int:
+        manager = self.manager
+        passengers = manager.key_pools.get(Passenger.id_passenger)
+        prices = self.prices()
+        if not passengers or not prices:
+            return 0
+        batch_size = batch_size or manager.batch_size
+        rng = manager.samples.rng
+        generated = 0
+        while generated < count:
+            size = min(batch_size, count - generated)
+            types = rng.integers(0, len(prices), size)
+            purchase_ids = manager.ids.take(Purchase.id_purchase, size)
+            self.write(
+                Purchase,
+                {
+                    "id_purchase": purchase_ids,
+                    "date": manager.samples.column("purchases.date", size).tolist(),
+                    "amount": prices.prices[types].tolist(),
+                },
+            )
+            self.write(
+                Ticket,
+                {
+                    "id_ticket": manager.ids.take(Ticket.id_ticket, size),
+                    "fk_passenger": passengers.sample(rng, size).tolist(),
+                    "fk_purchase": purchase_ids,
+                    "fk_ticket_type": prices.ids[types].tolist(),
+                },
+            )
+            manager.commit()
+            generated += size
+        return generated
+
+    def write(self, model, columns: dict) -> None:
+        if self.manager.sink:
+            self.manager.sink.write_columns(model, columns)
+            return
+        self.manager.session.execute(
+            model.__table__.insert(),
+            [dict(zip(columns, row)) for row in zip(*columns.values())],
+        )
@@ -0,0 +1,103 @@
+import heapq
+import numpy as np
+from key_pool import KeyPool
+from tables import VehicleStatusEnum
+
+SERVICE_START = 5 * 60
+SERVICE_END = 23 * 60
+LAYOVER = 5
+DEFAULT_TRAVEL_TIME = 30
+
+
+class Timetable:
+    def __init__(
+        self,
+        lines: KeyPool,
+        paths: KeyPool,
+        vehicles: KeyPool,
+        drivers: KeyPool,
+        seed,
+    ):
+        self.pools = (lines, paths, vehicles, drivers)
+        self.sizes = tuple(len(pool) for pool in self.pools)
+        line_ids, main_paths, frequencies = lines.values
+        self.line_ids = np.asarray(line_ids, dtype=np.int64)
+        self.main_paths = np.asarray(main_paths, dtype=np.int64)
+        self.frequencies = np.maximum(np.asarray(frequencies, dtype=np.int64), 1)
+        travel_times = dict(zip(*paths.values))
+        self.durations = np.array(
+            [travel_times.get(path, DEFAULT_TRAVEL_TIME) for path in main_paths],
+            dtype=np.int64,
+        )
+        self.rng = np.random.default_rng(seed)
+        self.vehicles = [
+            (0, int(vehicle))
+            for vehicle, status in zip(*vehicles.values)
+            if status == VehicleStatusEnum.Active
+        ]
+        self.drivers = [(0, int(driver)) for driver in drivers.values[0]]
+
+    def is_current(self, *pools) -> bool:
+        return all(
+            pool is current and len(pool) == size
+            for pool, current, size in zip(pools, self.pools, self.sizes)
+        )
+
+    def departures(self, day: np.datetime64) -> tuple[np.ndarray, np.ndarray]:
+        offsets = self.rng.integers(0, self.frequencies)
+        counts = np.maximum(
+            (SERVICE_END - SERVICE_START - offsets) // self.frequencies + 1, 0
+        )
+        lines = np.repeat(np.arange(len(self.line_ids)), counts)
+        positions = np.arange(len(lines)) - np.repeat(
+            np.cumsum(counts) - counts, counts
+        )
+        minutes = SERVICE_START + offsets[lines] + positions * self.frequencies[lines]
+        order = np.argsort(minutes, kind="stable")
+        return lines[order], day.astype("datetime64[m]") + minutes[order]
+
+    def rewind(self) -> None:
+        self.vehicles = sorted((0, vehicle) for _, vehicle in self.vehicles)
+        self.drivers = sorted((0, driver) for _, driver in self.drivers)
+
+    def rides_per_day(self, day: np.datetime64) -> int:
+        rng, vehicles, drivers = self.rng, self.vehicles, self.drivers
+        self.rng = np.random.default_rng(0)
+        self.rewind()
+        try:
+            return len(self.day(day))
+        finally:
+            self.rng, self.vehicles, self.drivers = rng, vehicles, drivers
+
+    def day(self, day: np.datetime64) -> list[tuple]:
+        lines, starts = self.departures(day)
+        ends = starts + self.durations[lines] + LAYOVER
+        start_minutes = starts.astype(np.int64).tolist()
+        end_minutes = ends.astype(np.int64).tolist()
+        weekday = int((day.astype(np.int64) + 3) % 7) + 1
+        rides = []
+        for line, start, end, start_time in zip(
+            lines.tolist(), start_minutes, end_minutes, starts.tolist()
+        ):
+            if (
+                not self.vehicles
+                or not self.drivers
+                or self.vehicles[0][0] > start
+                or self.drivers[0][0] > start
+            ):
+                continue
+            _, vehicle = heapq.heappop(self.vehicles)
+            _, driver = heapq.heappop(self.drivers)
+            heapq.heappush(self.vehicles, (end, vehicle))
+            heapq.heappush(self.drivers, (end, driver))
+            rides.append(
+                (
+                    int(self.line_ids[line]),
+                    int(self.main_paths[line]),
+                    vehicle,
+                    driver,
+                    start_time,
+                    weekday,
+                )
+            )
+        return rides
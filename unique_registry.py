@@ -0,0 +1,84 @@
+from collections import Counter
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+
+
+def suffixed(value, n):
+    return f"{value}{n}"
+
+
+class UniqueRegistry:
+    def __init__(self, session: Session | None, max_retries=10, partition=None):
+        self.session = session
+        self.max_retries = max_retries
+        self.owns = partition.owns if partition else lambda value: True
+        self.values: dict[tuple, set] = {}
+        self.retries = Counter()
+        self.fallbacks = Counter()
+        if session is not None:
+            event.listen(session, "after_flush", self._after_flush)
+
+    def used(self, column) -> set:
+        key = (column.class_, column.key)
+        if key not in self.values:
+            self.values[key] = (
+                {value for (value,) in self.session.execute(select(column))}
+                if self.session
+                else set()
+            )
+        return self.values[key]
+
+    def claim(self, column, generate, fallback=suffixed):
+        used = self.used(column)
+        key = (column.class_, column.key)
+        value = generate()
+        retries = 0
+        while self._taken(value, used) and retries < self.max_retries:
+            retries += 1
+            value = generate()
+        self.retries[key] += retries
+        if self._taken(value, used):
+            self.fallbacks[key] += 1
+            n = 2
+            while self._taken(candidate := fallback(value, n), used):
+                n += 1
+            value = candidate
+        used.add(value)
+        return value
+
+    def _taken(self, value, used) -> bool:
+        return value in used or not self.owns(value)
+
+    def invalidate(self, *models) -> None:
+        self.values = {
+            key: values
+            for key, values in self.values.items()
+            if models and key[0] not in models
+        }
+
+    def stats(self) -> dict:
+        return {
+            f"{cls.__tablename__}.{key}": {
+                "retries": self.retries[(cls, key)],
+                "fallbacks": self.fallbacks[(cls, key)],
+            }
+            for cls, key in {**self.retries, **self.fallbacks}
+        }
+
+    def report(self) -> None:
+        for column, stats in self.stats().items():
+            print(
+                f"{column}: {stats['retries']} retries, "
+                f"{stats['fallbacks']} fallbacks"
+            )
+
+    def _after_flush(self, session, flush_context) -> None:
+        if not self.values:
+            return
+        for obj in session.new:
+            self.add(obj)
+
+    def add(self, obj) -> None:
+        for cls, key in self.values:
+            if isinstance(obj, cls):
+                self.values[(cls, key)].add(getattr(obj, key))
@@ -0,0 +1,75 @@
+import os
+import numpy as np
+from faker import Faker
+
+PROVIDERS = (
+    "first_name",
+    "last_name",
+    "user_name",
+    "email",
+    "phone_number",
+    "street_address",
+    "text",
+    "password",
+)
+
+
+class VocabularyPool:
+    def __init__(self, data: np.ndarray, offsets: np.ndarray):
+        self.data = data
+        self.offsets = offsets
+
+    def __getitem__(self, index) -> str:
+        return (
+            self.data[self.offsets[index] : self.offsets[index + 1]].tobytes().decode()
+        )
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+
+class Vocabulary:
+    def __init__(self, directory, random, locale="pl_PL", seed=0, size=100000):
+        self.directory = directory
+        self.random = random
+        self.locale = locale
+        self.seed = seed
+        self.size = size
+        self.pools: dict[str, VocabularyPool] = {}
+
+    def pool(self, provider) -> VocabularyPool:
+        if provider not in self.pools:
+            path = os.path.join(
+                self.directory, f"{self.locale}-{self.seed}-{self.size}-{provider}"
+            )
+            if not os.path.exists(f"{path}.offsets.npy"):
+                self.build(provider, path)
+            self.pools[provider] = VocabularyPool(
+                np.load(f"{path}.data.npy", mmap_mode="r"),
+                np.load(f"{path}.offsets.npy", mmap_mode="r"),
+            )
+        return self.pools[provider]
+
+    def build(self, provider, path) -> None:
+        fake = Faker(self.locale)
+        fake.seed_instance(self.seed)
+        generate = getattr(fake, provider)
+        values = [generate().encode() for _ in range(self.size)]
+        offsets = np.zeros(self.size + 1, dtype=np.int64)
+        np.cumsum([len(value) for value in values], out=offsets[1:])
+        os.makedirs(self.directory, exist_ok=True)
+        for suffix, array in (
+            ("data", np.frombuffer(b"".join(values), dtype=np.uint8)),
+            ("offsets", offsets),
+        ):
+            with open(f"{path}.{os.getpid()}.tmp", "wb") as file:
+                np.save(file, array)
+            os.replace(f"{path}.{os.getpid()}.tmp", f"{path}.{suffix}.npy")
+
+    def __getattr__(self, provider):
+        if provider not in PROVIDERS:
+            raise AttributeError(provider)
+        pool = self.pool(provider)
+        draw = lambda: pool[self.random.randrange(len(pool))]
+        setattr(self, provider, draw)
+        return draw
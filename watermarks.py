@@ -0,0 +1,21 @@
+import json
+from sqlalchemy import delete
+from parallel import read_bases, serial_keys
+
+
+def save_watermarks(engine, path) -> dict[str, int]:
+    marks = read_bases(engine)
+    with open(path, "w") as file:
+        json.dump(marks, file, indent=2)
+    return marks
+
+
+def load_watermarks(path) -> dict[str, int]:
+    with open(path) as file:
+        return json.load(file)
+
+
+def revert_to_watermarks(engine, marks: dict[str, int]) -> None:
+    with engine.begin() as conn:
+        for key in reversed(serial_keys()):
+            conn.execute(delete(key.table).where(key > marks.get(key.table.name, 0)))